@@ -17,6 +17,7 @@ The web app communicates via:
 """
 
 import atexit
+import json
 import logging
 import os
 import signal
@@ -25,6 +26,7 @@ import threading
 import time
 import webbrowser
 from datetime import datetime, timezone
+from typing import TYPE_CHECKING
 
 # ── Logging (to file when running as .exe, also to console) ────
 log_dir = os.path.join(os.path.expanduser("~"), ".crazydesk")
@@ -44,7 +46,6 @@ logger = logging.getLogger("crazydesk")
 
 from modules.firebase_api import (
     set_session,
-    get_session,
     has_session,
     refresh_token,
     get_active_session,
@@ -54,16 +55,23 @@ from modules.firebase_api import (
     check_out,
     emergency_check_out,
     update_heartbeat,
+    warmup,
+    iso_to_ms,
 )
 from modules.capture import perform_capture, start_all_tracking, stop_all_tracking, set_countdown_callbacks, set_break_status
 from modules.activity import (
     start_activity_tracking,
     stop_activity_tracking,
-    flush_activity,
+    take_activity,
+    restore_activity,
     get_counts,
+    FLUSH_INTERVAL_SEC,
 )
 from modules.local_server import set_handlers, start_server, stop_server, PORT
-from modules.gui import TrackerGUI
+from modules import scheduler
+
+if TYPE_CHECKING:
+    from modules.gui import TrackerGUI
 
 # ── Session state ──────────────────────────────────────────────
 
@@ -73,22 +81,34 @@ is_on_break: bool = False
 break_start_ms: int | None = None
 total_break_sec: int = 0
 capture_count: int = 0
+_user_name: str = ""      # display name cached at check-in (fixed for the session)
 
-_heartbeat_running = False
-_heartbeat_thread: threading.Thread | None = None
+_heartbeat_task: scheduler.Task | None = None
+_next_activity_at = 0.0   # monotonic deadline for the next activity upload
 _shutdown_event = threading.Event()
-_gui: TrackerGUI | None = None
+_gui: "TrackerGUI | None" = None
 
 WEB_APP_URL = "https://crazydesk.vercel.app/dashboard"
 
+# /api/status has a fixed shape, so it is rendered from a template with the
+# static fields pre-encoded instead of going through json.dumps per poll.
+_STATUS_TMPL = (
+    '{"running":true,"version":"1.0.0","platform":' + json.dumps(sys.platform)
+    + ',"hasSession":%s,"sessionId":%s,"isOnBreak":%s,"captureCount":%d'
+    ',"clicks":%d,"keystrokes":%d,"heartbeatOk":%s,"heartbeatFailures":%d}'
+)
+
 
 def _to_epoch_ms(val) -> int:
     """Convert any timestamp representation (datetime, str, number) to epoch ms."""
+    t = type(val)
+    if t is float or t is int:
+        return int(val) if val > 1e12 else int(val * 1000)
     if isinstance(val, datetime):
         return int(val.timestamp() * 1000)
     if isinstance(val, str):
         try:
-            return int(datetime.fromisoformat(val.replace("Z", "+00:00")).timestamp() * 1000)
+            return iso_to_ms(val)
         except (ValueError, AttributeError):
             return int(time.time() * 1000)
     if isinstance(val, (int, float)):
@@ -102,71 +122,102 @@ def _to_epoch_ms(val) -> int:
 _heartbeat_failures = 0
 _MAX_HEARTBEAT_FAILURES = 5
 
-def _heartbeat_loop():
-    global _heartbeat_failures
-    while _heartbeat_running and not _shutdown_event.is_set():
-        if session_id:
-            try:
-                update_heartbeat(session_id)
-                if _heartbeat_failures > 0:
-                    logger.info("Heartbeat recovered after %d failures", _heartbeat_failures)
-                _heartbeat_failures = 0
-            except Exception as e:
-                _heartbeat_failures += 1
-                if _heartbeat_failures <= 3 or _heartbeat_failures % 10 == 0:
-                    logger.warning(
-                        "Heartbeat failed (%d consecutive): %s",
-                        _heartbeat_failures, e,
-                    )
-                if _heartbeat_failures == _MAX_HEARTBEAT_FAILURES:
-                    logger.error(
-                        "Heartbeat failed %d times — token may be expired. "
-                        "Waiting for web app to send a fresh token via /api/refresh.",
-                        _heartbeat_failures,
-                    )
-        _shutdown_event.wait(30)
+HEARTBEAT_INTERVAL_SEC = 30
+STATS_INTERVAL_SEC = 10
+
+
+def _heartbeat_tick():
+    global _heartbeat_failures, _next_activity_at
+    if not session_id:
+        return
+    # Every FLUSH_INTERVAL_SEC the activity counts ride along in the same request
+    activity = None
+    now = time.monotonic()
+    if now >= _next_activity_at:
+        activity = take_activity()
+        _next_activity_at = now + FLUSH_INTERVAL_SEC
+    try:
+        update_heartbeat(session_id, activity=activity)
+        if activity:
+            logger.info(
+                "Activity flushed: %d clicks, %d keystrokes",
+                activity["mouseClicks"], activity["keystrokes"],
+            )
+        if _heartbeat_failures > 0:
+            logger.info("Heartbeat recovered after %d failures", _heartbeat_failures)
+        _heartbeat_failures = 0
+    except Exception as e:
+        if activity:
+            restore_activity(activity)
+        _heartbeat_failures += 1
+        if _heartbeat_failures <= 3 or _heartbeat_failures % 10 == 0:
+            logger.warning(
+                "Heartbeat failed (%d consecutive): %s",
+                _heartbeat_failures, e,
+            )
+        if _heartbeat_failures == _MAX_HEARTBEAT_FAILURES:
+            logger.error(
+                "Heartbeat failed %d times — token may be expired. "
+                "Waiting for web app to send a fresh token via /api/refresh.",
+                _heartbeat_failures,
+            )
 
 
 def start_heartbeat():
-    global _heartbeat_thread, _heartbeat_running
+    global _heartbeat_task, _next_activity_at
     stop_heartbeat()
-    _heartbeat_running = True
-    _heartbeat_thread = threading.Thread(target=_heartbeat_loop, daemon=True)
-    _heartbeat_thread.start()
+    _next_activity_at = time.monotonic() + FLUSH_INTERVAL_SEC
+    # First beat right away, then every HEARTBEAT_INTERVAL_SEC
+    _heartbeat_task = scheduler.schedule(0, _heartbeat_tick, interval=HEARTBEAT_INTERVAL_SEC)
 
 
 def stop_heartbeat():
-    global _heartbeat_running, _heartbeat_thread
-    _heartbeat_running = False
-    _heartbeat_thread = None
+    global _heartbeat_task
+    if _heartbeat_task:
+        _heartbeat_task.cancel()
+        _heartbeat_task = None
 
 
 # ── GUI helpers ────────────────────────────────────────────────
 
-def _sync_gui():
-    """Push current state to the GUI."""
+def _sync_gui(status: str | None = None):
+    """Push current session state + stats (and optionally the status) to the GUI."""
     if not _gui:
         return
-    session = get_session()
-    _gui.update_session(
-        user_name=session.get("display_name", "") or "",
-        session_id=session_id or "",
-        check_in_ms=check_in_time_ms or 0,
-        total_break_sec=total_break_sec,
-        break_start_ms=break_start_ms or 0,
-        is_on_break=is_on_break,
-    )
     clicks, keys = get_counts()
-    _gui.update_stats(captures=capture_count, clicks=clicks, keys=keys)
+    state = {
+        "user_name": _user_name,
+        "session_id": session_id or "",
+        "check_in_ms": check_in_time_ms or 0,
+        "total_break_sec": total_break_sec,
+        "break_start_ms": break_start_ms or 0,
+        "is_on_break": is_on_break,
+        "connected": bool(session_id),
+        "captures": capture_count,
+        "clicks": clicks,
+        "keys": keys,
+    }
+    if status:
+        state["status"] = status
+    _gui.post_state(state)
+
 
+_stats_dirty = threading.Event()
 
-def _stats_updater():
-    """Background thread that pushes activity stats to GUI every 10s."""
-    while not _shutdown_event.is_set():
-        _shutdown_event.wait(10)
-        if _gui and session_id:
-            clicks, keys = get_counts()
-            _gui.update_stats(captures=capture_count, clicks=clicks, keys=keys)
+
+def _mark_stats_dirty():
+    """Request an early stats push; a burst of requests collapses into one."""
+    if not _stats_dirty.is_set():
+        _stats_dirty.set()
+        scheduler.schedule(0, _stats_tick)
+
+
+def _stats_tick():
+    """Scheduled every STATS_INTERVAL_SEC (or early when dirty) to push stats to the GUI."""
+    _stats_dirty.clear()
+    if _gui and session_id:
+        clicks, keys = get_counts()
+        _gui.post_state({"captures": capture_count, "clicks": clicks, "keys": keys})
 
 
 # ── Tracking lifecycle ─────────────────────────────────────────
@@ -184,22 +235,28 @@ def on_capture_done(result):
         "yes" if result.get("camera_url") else "no",
         flagged,
     )
-    if _gui:
-        clicks, keys = get_counts()
-        _gui.update_stats(captures=capture_count, clicks=clicks, keys=keys)
+    _mark_stats_dirty()
+
+
+_tracking_started = False
 
 
 def start_tracking():
+    global _tracking_started
+    _tracking_started = True
     start_all_tracking(on_capture=on_capture_done)
     start_activity_tracking()
     start_heartbeat()
-    if _gui:
-        _gui.update_status("active")
-    _sync_gui()
+    _sync_gui("break" if is_on_break else "active")
     logger.info("All tracking started")
 
 
 def stop_tracking():
+    """Stop all tracking (also sends the final activity counts). Safe to call twice."""
+    global _tracking_started
+    if not _tracking_started:
+        return
+    _tracking_started = False
     stop_all_tracking()
     stop_activity_tracking()
     stop_heartbeat()
@@ -211,30 +268,31 @@ def stop_tracking():
 # ── Emergency checkout on exit ─────────────────────────────────
 
 def do_emergency_checkout():
-    global session_id, check_in_time_ms
+    global session_id, check_in_time_ms, _user_name
     if session_id and has_session():
         logger.info("Emergency checkout for session: %s", session_id)
         stop_tracking()
-        flush_activity()
         try:
             emergency_check_out(session_id, check_in_time_ms or 0, total_break_sec)
         except Exception as e:
             logger.error("Emergency checkout failed: %s", e)
         session_id = None
         check_in_time_ms = None
+        _user_name = ""
         set_break_status(False)
 
 
 # ── HTTP handler callbacks ─────────────────────────────────────
 
 def handle_checkin(data: dict) -> dict:
-    global session_id, check_in_time_ms, is_on_break, break_start_ms, total_break_sec, capture_count
+    global session_id, check_in_time_ms, is_on_break, break_start_ms, total_break_sec, capture_count, _user_name
 
     token = data["token"]
     uid = data["uid"]
     name = data.get("name", "User")
 
     set_session(token, uid, name)
+    _user_name = name or ""
     logger.info("Session received for: %s (%s)", name, uid)
 
     if _gui:
@@ -252,16 +310,16 @@ def handle_checkin(data: dict) -> dict:
             total_break_sec = 0
             break_start_ms = None
 
-            for b in existing.get("breaks", []) or []:
+            breaks_t = tuple(existing.get("breaks") or ())
+            for b in breaks_t:
                 if b.get("endTime"):
                     s_ms = _to_epoch_ms(b["startTime"])
                     e_ms = _to_epoch_ms(b["endTime"])
                     total_break_sec += max(0, int((e_ms - s_ms) / 1000))
 
             if is_on_break:
-                breaks = existing.get("breaks", []) or []
-                if breaks:
-                    last = breaks[-1]
+                if breaks_t:
+                    last = breaks_t[-1]
                     if not last.get("endTime"):
                         break_start_ms = _to_epoch_ms(last["startTime"])
                 if _gui:
@@ -317,9 +375,7 @@ def handle_capture(data: dict) -> dict:
         if result.get("skipped"):
             return {"ok": True, "skipped": True}
         capture_count += 1
-        if _gui:
-            clicks, keys = get_counts()
-            _gui.update_stats(captures=capture_count, clicks=clicks, keys=keys)
+        _mark_stats_dirty()
         return {
             "ok": True,
             "flagged": result.get("flagged", True),
@@ -331,7 +387,7 @@ def handle_capture(data: dict) -> dict:
 
 
 def handle_checkout(data: dict) -> dict:
-    global session_id, check_in_time_ms, is_on_break, break_start_ms, total_break_sec
+    global session_id, check_in_time_ms, is_on_break, break_start_ms, total_break_sec, _user_name
 
     if not session_id:
         return {"ok": False, "error": "No active session"}
@@ -344,11 +400,11 @@ def handle_checkout(data: dict) -> dict:
 
     try:
         stop_tracking()
-        flush_activity()
         check_out(session_id, check_in_time_ms or 0, report, proof_link, total_break_sec)
 
         session_id = None
         check_in_time_ms = None
+        _user_name = ""
         is_on_break = False
         break_start_ms = None
         total_break_sec = 0
@@ -363,21 +419,23 @@ def handle_checkout(data: dict) -> dict:
         return {"ok": False, "error": str(e)}
 
 
-def handle_status() -> dict:
+def _json_bool(v) -> str:
+    return "true" if v else "false"
+
+
+def handle_status() -> bytes:
+    """Return the already-encoded JSON body for GET /api/status."""
     clicks, keys = get_counts()
-    return {
-        "running": True,
-        "version": "1.0.0",
-        "platform": sys.platform,
-        "hasSession": has_session(),
-        "sessionId": session_id,
-        "isOnBreak": is_on_break,
-        "captureCount": capture_count,
-        "clicks": clicks,
-        "keystrokes": keys,
-        "heartbeatOk": _heartbeat_failures < _MAX_HEARTBEAT_FAILURES,
-        "heartbeatFailures": _heartbeat_failures,
-    }
+    return (_STATUS_TMPL % (
+        _json_bool(has_session()),
+        json.dumps(session_id),
+        _json_bool(is_on_break),
+        capture_count,
+        clicks,
+        keys,
+        _json_bool(_heartbeat_failures < _MAX_HEARTBEAT_FAILURES),
+        _heartbeat_failures,
+    )).encode()
 
 
 def handle_break(data: dict) -> dict:
@@ -392,16 +450,7 @@ def handle_break(data: dict) -> dict:
         is_on_break = True
         break_start_ms = int(time.time() * 1000)
         set_break_status(True)
-        if _gui:
-            _gui.update_status("break")
-            _gui.update_session(
-                user_name=get_session().get("display_name", ""),
-                session_id=session_id,
-                check_in_ms=check_in_time_ms or 0,
-                total_break_sec=total_break_sec,
-                break_start_ms=break_start_ms,
-                is_on_break=True,
-            )
+        _sync_gui("break")
         logger.info("Break started")
         return {"ok": True}
     except Exception as e:
@@ -422,16 +471,7 @@ def handle_resume(data: dict) -> dict:
         is_on_break = False
         break_start_ms = None
         set_break_status(False)
-        if _gui:
-            _gui.update_status("active")
-            _gui.update_session(
-                user_name=get_session().get("display_name", ""),
-                session_id=session_id,
-                check_in_ms=check_in_time_ms or 0,
-                total_break_sec=total_break_sec,
-                break_start_ms=0,
-                is_on_break=False,
-            )
+        _sync_gui("active")
         logger.info("Break ended, total break: %ds", total_break_sec)
         return {"ok": True}
     except Exception as e:
@@ -451,7 +491,7 @@ def handle_gui_break():
 
 def handle_gui_checkout(report: str, proof_link: str):
     """Called from the GUI checkout dialog (runs in a background thread)."""
-    global session_id, check_in_time_ms, is_on_break, break_start_ms, total_break_sec
+    global session_id, check_in_time_ms, is_on_break, break_start_ms, total_break_sec, _user_name
 
     if not session_id:
         logger.warning("GUI checkout called but no active session")
@@ -460,11 +500,11 @@ def handle_gui_checkout(report: str, proof_link: str):
     logger.info("GUI checkout for session: %s", session_id)
     try:
         stop_tracking()
-        flush_activity()
         check_out(session_id, check_in_time_ms or 0, report, proof_link, total_break_sec)
 
         session_id = None
         check_in_time_ms = None
+        _user_name = ""
         is_on_break = False
         break_start_ms = None
         total_break_sec = 0
@@ -477,10 +517,23 @@ def handle_gui_checkout(report: str, proof_link: str):
         logger.error("GUI checkout failed: %s", e)
 
 
+def _dashboard_opener():
+    """Resolve the browser once at startup so the first click doesn't stall on lookup."""
+    if sys.platform == "win32":
+        # ShellExecute on the URL — what webbrowser's Windows default does, minus the probing
+        return lambda: os.startfile(WEB_APP_URL)
+    try:
+        browser = webbrowser.get()
+    except webbrowser.Error:
+        return lambda: webbrowser.open(WEB_APP_URL)
+    return lambda: browser.open(WEB_APP_URL)
+
+
 def cleanup():
     """Clean up all resources on exit."""
     do_emergency_checkout()
-    stop_tracking()
+    stop_tracking()          # no-op unless tracking outlived the session
+    scheduler.shutdown()
     stop_server()
     logger.info("Goodbye!")
 
@@ -518,9 +571,11 @@ def main():
     # Start local HTTP server (background thread)
     start_server()
 
-    # Start stats updater thread
-    stats_thread = threading.Thread(target=_stats_updater, daemon=True)
-    stats_thread.start()
+    # Pay the Firestore TLS handshake now rather than on the first heartbeat
+    scheduler.schedule(0, warmup)
+
+    # Push activity stats to the GUI periodically
+    scheduler.schedule(STATS_INTERVAL_SEC, _stats_tick, interval=STATS_INTERVAL_SEC)
 
     # Register cleanup
     atexit.register(cleanup)
@@ -535,10 +590,13 @@ def main():
 
     logger.info("Starting GUI...")
 
+    # tkinter / pystray are only loaded once we actually need the window
+    from modules.gui import TrackerGUI
+
     # Create and run GUI (blocks on tkinter mainloop)
     _gui = TrackerGUI(
         on_quit=_on_gui_quit,
-        on_open_dashboard=lambda: webbrowser.open(WEB_APP_URL),
+        on_open_dashboard=_dashboard_opener(),
         on_checkout=handle_gui_checkout,
         on_break=handle_gui_break,
     )
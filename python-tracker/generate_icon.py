@@ -5,9 +5,19 @@ Run this once to create the icon file used by the .exe build.
 """
 
 from PIL import Image, ImageDraw, ImageFont
+import functools
 import os
 
 SIZES = [16, 24, 32, 48, 64, 128, 256]
+TEXT_MIN_SIZE = 48  # below this the "CD" text is unreadable, use a dot instead
+
+
+@functools.lru_cache(maxsize=None)
+def _font(size: int):
+    try:
+        return ImageFont.truetype("arial.ttf", size=size)
+    except Exception:
+        return ImageFont.load_default()
 
 
 def create_icon_frame(size: int) -> Image.Image:
@@ -24,11 +34,8 @@ def create_icon_frame(size: int) -> Image.Image:
     )
 
     # "CD" text or just a colored dot for small sizes
-    if size >= 48:
-        try:
-            font = ImageFont.truetype("arial.ttf", size=size // 3)
-        except Exception:
-            font = ImageFont.load_default()
+    if size >= TEXT_MIN_SIZE:
+        font = _font(size // 3)
         bbox = draw.textbbox((0, 0), "CD", font=font)
         tw, th = bbox[2] - bbox[0], bbox[3] - bbox[1]
         tx = (size - tw) // 2
@@ -52,7 +59,13 @@ def main():
     png_path = os.path.join(out_dir, "assets", "icon.png")
     os.makedirs(os.path.join(out_dir, "assets"), exist_ok=True)
 
-    frames = [create_icon_frame(s) for s in SIZES]
+    # Render one master per design at its largest size, downsample the rest
+    big = create_icon_frame(max(SIZES))
+    small = create_icon_frame(max(s for s in SIZES if s < TEXT_MIN_SIZE))
+    frames = [
+        (big if s >= TEXT_MIN_SIZE else small).resize((s, s), Image.LANCZOS)
+        for s in SIZES
+    ]
 
     # Save .ico (multi-size)
     frames[0].save(ico_path, format="ICO", sizes=[(s, s) for s in SIZES], append_images=frames[1:])
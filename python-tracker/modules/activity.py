@@ -2,98 +2,119 @@
 CrazyDesk Tracker — Activity tracking module (keyboard + mouse)
 ===============================================================
 Uses pynput to track global mouse clicks and keystrokes.
-Flushes counts to Firestore every 5 minutes.
+Counts are sent to Firestore every 5 minutes, riding along with the
+heartbeat request (see take_activity), or right away via flush_activity.
 """
 
 import logging
 import threading
-import time
 from datetime import datetime, timezone
-
-from pynput import mouse, keyboard
+from typing import TYPE_CHECKING
 
 from modules.firebase_api import get_session, has_session, save_activity_log
 
+if TYPE_CHECKING:
+    from pynput import mouse, keyboard
+
 logger = logging.getLogger("crazydesk.activity")
 
+_UTC = timezone.utc
+
+# Running totals, each written only by its own pynput listener thread, so the
+# input hot path needs no lock. take_activity() never resets them — it moves
+# the (clicks, keys) "consumed" marker forward instead. The marker is replaced
+# as one tuple so readers never see it half-updated.
 _mouse_clicks = 0
 _keystrokes = 0
-_lock = threading.Lock()
+_consumed: tuple[int, int] = (0, 0)
+# Only taken by take_activity()/restore_activity() — a few times per flush
+# interval, never per input event. It stops a heartbeat upload and a checkout
+# flush running at the same moment from both claiming the same counts.
+_flush_lock = threading.Lock()
+
+# (uid, display_name) captured when tracking starts — fixed for the session
+_user: tuple[str | None, str | None] = (None, None)
 
-_mouse_listener: mouse.Listener | None = None
-_keyboard_listener: keyboard.Listener | None = None
-_flush_timer: threading.Timer | None = None
-_running = False
+_mouse_listener: "mouse.Listener | None" = None
+_keyboard_listener: "keyboard.Listener | None" = None
 
-FLUSH_INTERVAL_SEC = 5 * 60  # 5 minutes
+FLUSH_INTERVAL_SEC = 5 * 60  # 5 minutes — one activity_logs entry per interval
 
 
 def _on_click(x, y, button, pressed):
     global _mouse_clicks
     if pressed:
-        with _lock:
-            _mouse_clicks += 1
+        _mouse_clicks += 1
 
 
 def _on_key_press(key):
     global _keystrokes
-    with _lock:
-        _keystrokes += 1
+    _keystrokes += 1
 
 
-def _flush_loop():
-    """Periodically flush activity counts to Firestore."""
-    while _running:
-        time.sleep(FLUSH_INTERVAL_SEC)
-        if not _running:
-            break
-        flush_activity()
+def take_activity() -> dict | None:
+    """
+    Claim the counts accumulated since the last send as an activity_logs
+    payload. Returns None (claiming nothing) if there is nothing to send.
+    Pass the payload to restore_activity() if the upload fails.
+    """
+    global _consumed
+    if not has_session():
+        return None
+    with _flush_lock:
+        clicks_total, keys_total = _mouse_clicks, _keystrokes
+        clicks = clicks_total - _consumed[0]
+        keys = keys_total - _consumed[1]
+        if not clicks and not keys:
+            return None
+        _consumed = (clicks_total, keys_total)
+
+    uid, display_name = _user
+    return {
+        "userId": uid,
+        "userDisplayName": display_name,
+        "mouseClicks": clicks,
+        "keystrokes": keys,
+        "lastActive": datetime.now(_UTC),
+        "source": "desktop",
+    }
+
+
+def restore_activity(payload: dict):
+    """Give back counts claimed by take_activity() so they aren't lost."""
+    global _consumed
+    with _flush_lock:
+        _consumed = (_consumed[0] - payload["mouseClicks"], _consumed[1] - payload["keystrokes"])
 
 
 def flush_activity():
-    """Send accumulated activity counts to Firestore and reset."""
-    global _mouse_clicks, _keystrokes
-    with _lock:
-        clicks = _mouse_clicks
-        keys = _keystrokes
-        _mouse_clicks = 0
-        _keystrokes = 0
-
-    if not clicks and not keys:
-        return
-
-    if not has_session():
+    """Send accumulated activity counts to Firestore immediately (checkout / quit)."""
+    payload = take_activity()
+    if not payload:
         return
-
-    session = get_session()
     try:
-        save_activity_log({
-            "userId": session["uid"],
-            "userDisplayName": session["display_name"],
-            "mouseClicks": clicks,
-            "keystrokes": keys,
-            "lastActive": datetime.now(timezone.utc),
-            "source": "desktop",
-        })
-        logger.info("Activity flushed: %d clicks, %d keystrokes", clicks, keys)
+        save_activity_log(payload)
+        logger.info("Activity flushed: %d clicks, %d keystrokes", payload["mouseClicks"], payload["keystrokes"])
     except Exception as e:
         logger.error("Activity flush error: %s", e)
-        # Put them back so they aren't lost
-        with _lock:
-            _mouse_clicks += clicks
-            _keystrokes += keys
+        restore_activity(payload)
 
 
 def get_counts() -> tuple[int, int]:
     """Return current (clicks, keystrokes) without resetting."""
-    with _lock:
-        return _mouse_clicks, _keystrokes
+    clicks_done, keys_done = _consumed
+    return _mouse_clicks - clicks_done, _keystrokes - keys_done
 
 
 def start_activity_tracking():
-    global _mouse_listener, _keyboard_listener, _flush_timer, _running
+    global _mouse_listener, _keyboard_listener, _user
+    # Imported here: loading pynput sets up platform input hooks, which is
+    # wasted work until tracking actually starts.
+    from pynput import mouse, keyboard
+
     stop_activity_tracking()
-    _running = True
+    session = get_session()
+    _user = (session["uid"], session["display_name"])
 
     _mouse_listener = mouse.Listener(on_click=_on_click)
     _mouse_listener.daemon = True
@@ -103,15 +124,14 @@ def start_activity_tracking():
     _keyboard_listener.daemon = True
     _keyboard_listener.start()
 
-    _flush_timer = threading.Thread(target=_flush_loop, daemon=True)
-    _flush_timer.start()
-
     logger.info("Activity tracking started (mouse + keyboard)")
 
 
 def stop_activity_tracking():
-    global _mouse_listener, _keyboard_listener, _flush_timer, _running
-    _running = False
+    """Stop the listeners and send whatever counts are still pending."""
+    global _mouse_listener, _keyboard_listener
+    if not (_mouse_listener or _keyboard_listener):
+        return
 
     if _mouse_listener:
         _mouse_listener.stop()
@@ -121,5 +141,5 @@ def stop_activity_tracking():
         _keyboard_listener.stop()
         _keyboard_listener = None
 
-    _flush_timer = None
+    flush_activity()
     logger.info("Activity tracking stopped")
@@ -1,7 +1,8 @@
 """
 CrazyDesk Tracker — Screen + Camera capture module
 ===================================================
-Screen capture  : mss (works on Windows, macOS, Linux — no prompts)
+Screen capture  : mss (works on Windows, macOS, Linux — no prompts);
+                  DXGI Desktop Duplication via dxcam on Windows when installed
 Camera capture  : OpenCV (cv2)
 Upload          : Supabase Storage via supabase_upload module
 
@@ -13,18 +14,18 @@ FLOW  — 1. Capture each display instantly (one screenshot per monitor)
 LOCK  — Only ONE capture can run at a time.
 """
 
-import io
 import logging
 import os
 import random
 import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 import cv2
 import mss
-from PIL import Image
+import numpy as np
 
 from modules.firebase_api import (
     get_session,
@@ -33,15 +34,18 @@ from modules.firebase_api import (
     check_capture_commands,
     complete_capture_command,
 )
-from modules.supabase_upload import upload_image
+from modules.supabase_upload import upload_image_async
 
 logger = logging.getLogger("crazydesk.capture")
 
 CAPTURE_MIN_MIN = 10
 CAPTURE_MAX_MIN = 30
 REMOTE_POLL_SEC = 15
+REMOTE_POLL_MAX_SEC = 120       # idle back-off cap; well under MAX_COMMAND_AGE_SEC
 COUNTDOWN_SECONDS = 60          # 1-minute warning before capture
 POST_CAPTURE_COOLDOWN_SEC = 120  # 2 min cooldown after any capture
+SCREEN_MAX_EDGE = 1600          # screenshots are downscaled to this long edge before encoding
+SCREEN_JPEG_QUALITY = 75
 
 
 # Track the last capture completion time (epoch seconds) to enforce global cooldown
@@ -103,145 +107,335 @@ def set_countdown_callbacks(on_tick=None, on_done=None):
 
 # ── Screen capture ─────────────────────────────────────────────
 
-def capture_screen() -> list[bytes]:
-    """Take a silent screenshot of each monitor. Returns list of JPEG bytes (one per display)."""
-    screenshots: list[bytes] = []
+# mss keeps its GDI/X11 handles in thread-local storage and only frees them in
+# close(), so every grab runs on one long-lived worker that owns a single cached
+# instance (and the dxcam handles). Short-lived callers — HTTP handlers, the
+# per-check-in auto/remote threads — just submit to it and wait. The instance is
+# rebuilt after any grab error, e.g. when displays change.
+_GRAB_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screen-grab")
+_sct: "mss.base.MSSBase | None" = None   # touched only on the _GRAB_POOL thread
+
+# Windows: optional DXGI Desktop Duplication via dxcam — much cheaper than
+# mss's GDI BitBlt. None = not probed yet, False = unavailable.
+_dxcam = None
+_dx_cams: dict = {}   # output index → dxcam.DXCamera
+
+
+def _dxgi_grab(idx: int):
+    """Grab display `idx` as a BGR array via dxcam, or None to fall back to mss."""
+    global _dxcam
+    if _dxcam is None:
+        try:
+            import dxcam
+            _dxcam = dxcam
+        except Exception:
+            _dxcam = False
+            logger.info("dxcam not available — using mss for screen capture")
+    if not _dxcam:
+        return None
+    cam = _dx_cams.get(idx)
+    if cam is None:
+        try:
+            cam = _dxcam.create(output_idx=idx, output_color="BGR")
+        except Exception as e:
+            logger.debug("dxcam unavailable for display %d: %s", idx + 1, e)
+            return None
+        _dx_cams[idx] = cam
+    try:
+        # None when the desktop hasn't changed since the last grab
+        return cam.grab()
+    except Exception as e:
+        # Access lost, mode change or device removed — drop the camera and let
+        # mss take this display; it is recreated on the next capture.
+        logger.debug("dxcam grab failed for display %d: %s", idx + 1, e)
+        _dx_cams.pop(idx, None)
+        try:
+            cam.release()
+        except Exception:
+            pass
+        return None
+
+
+def _close_sct():
+    """Release the cached capture handles. Runs on the _GRAB_POOL thread."""
+    global _sct
+    if _sct is not None:
+        try:
+            _sct.close()
+        except Exception:
+            pass
+        _sct = None
+    for cam in _dx_cams.values():
+        try:
+            cam.release()
+        except Exception:
+            pass
+    _dx_cams.clear()
+
+
+def _jpeg_view(buf) -> memoryview:
+    """
+    Flat byte view over a cv2.imencode result. The uploader sends it as-is,
+    so the encoded JPEG is never copied into a separate bytes object.
+    """
+    return memoryview(buf).cast("B")
+
+
+def _encode_screen(frame) -> memoryview:
+    """Downscale a BGR frame to SCREEN_MAX_EDGE (if larger) and JPEG-encode it."""
+    h, w = frame.shape[:2]
+    scale = SCREEN_MAX_EDGE / max(h, w)
+    if scale < 1.0:
+        # INTER_AREA averages source pixels — sharper than encoding full-res then shrinking
+        frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode(".jpg", frame, [
+        cv2.IMWRITE_JPEG_QUALITY, SCREEN_JPEG_QUALITY,
+        cv2.IMWRITE_JPEG_OPTIMIZE, 1,
+    ])
+    if not ok:
+        raise RuntimeError("JPEG encode failed")
+    return _jpeg_view(buf)
+
+
+def _grab_screens() -> list[memoryview]:
+    """Grab and encode every display. Runs on the _GRAB_POOL thread."""
+    global _sct
+    screenshots: list[memoryview] = []
+    failed = False
     try:
-        with mss.mss() as sct:
-            # monitors[1:] are individual displays; monitors[0] is the combined bounding box
-            displays = sct.monitors[1:] if len(sct.monitors) > 1 else sct.monitors
-            for idx, monitor in enumerate(displays):
-                try:
+        if _sct is None:
+            _sct = mss.mss()
+        sct = _sct
+        # monitors[1:] are individual displays; monitors[0] is the combined bounding box
+        displays = sct.monitors[1:] if len(sct.monitors) > 1 else sct.monitors
+        for idx, monitor in enumerate(displays):
+            try:
+                frame = _dxgi_grab(idx) if sys.platform == "win32" else None
+                if frame is None:
                     shot = sct.grab(monitor)
-                    img = Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
-                    buf = io.BytesIO()
-                    img.save(buf, format="JPEG", quality=80)
-                    jpeg_bytes = buf.getvalue()
-                    logger.info("Display %d captured: %d bytes (%dx%d)", idx + 1, len(jpeg_bytes), img.width, img.height)
-                    screenshots.append(jpeg_bytes)
-                except Exception as e:
-                    logger.error("Display %d capture error: %s", idx + 1, e)
+                    # View the grab buffer as HxWx4 BGRA (shot.bgra would copy it first);
+                    # OpenCV works in BGR natively, so only the alpha byte is dropped.
+                    bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+                    frame = cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)
+                jpeg_bytes = _encode_screen(frame)
+                logger.info("Display %d captured: %d bytes (%dx%d)", idx + 1, len(jpeg_bytes), frame.shape[1], frame.shape[0])
+                screenshots.append(jpeg_bytes)
+            except Exception as e:
+                failed = True
+                logger.error("Display %d capture error: %s", idx + 1, e)
     except Exception as e:
+        failed = True
         logger.error("Screen capture error: %s", e)
+    if failed:
+        _close_sct()
     return screenshots
 
 
+def capture_screen() -> list[memoryview]:
+    """Take a silent screenshot of each monitor. Returns list of JPEG buffers (one per display)."""
+    try:
+        return _GRAB_POOL.submit(_grab_screens).result()
+    except RuntimeError as e:   # pool already shut down at interpreter exit
+        logger.error("Screen capture error: %s", e)
+        return []
+
+
 # ── Camera capture ─────────────────────────────────────────────
 
 def _is_blank_frame(frame, threshold: float = 12.0) -> bool:
     """Return True if the frame is mostly black / blank."""
-    import numpy as np
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    return float(np.mean(gray)) < threshold
+    # Mean over every 8th pixel of all BGR channels — plenty to spot a black frame
+    return float(frame[::8, ::8].mean()) < threshold
 
 
-def capture_camera() -> bytes | None:
-    """Take a silent webcam photo. Returns JPEG bytes or None."""
-    cap = None
-    try:
-        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)   # DirectShow is more reliable on Windows
+CAMERA_WARMUP_LEAD_SEC = 5   # open the webcam this long before the photo so exposure settles
+CAMERA_WARMUP_FRAMES = 20    # many webcams need 10-30 frames before producing a usable image
+
+
+def _open_camera():
+    cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)   # DirectShow is more reliable on Windows
+    if not cap.isOpened():
+        logger.warning("Camera not available (DirectShow), trying default backend")
+        cap = cv2.VideoCapture(0)
         if not cap.isOpened():
-            logger.warning("Camera not available (DirectShow), trying default backend")
-            cap = cv2.VideoCapture(0)
-            if not cap.isOpened():
-                logger.warning("Camera not available")
-                return None
-
-        # Force a reasonable resolution so the sensor activates properly
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-
-        # Discard warmup frames so sensor auto-exposure / white-balance can settle.
-        # Many webcams need 10-30 frames before producing a usable image.
-        warmup_frames = 20
-        for _ in range(warmup_frames):
-            cap.read()
-        time.sleep(0.3)          # extra settling time after warmup reads
-
-        # Now read the real frame — retry a couple of times if still blank
-        frame = None
+            logger.warning("Camera not available")
+            return None
+
+    # Force a reasonable resolution so the sensor activates properly
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    return cap
+
+
+class _CameraWarmup:
+    """
+    Opens the webcam on a background thread and keeps reading frames so
+    auto-exposure / white-balance settle while the countdown finishes.
+    Started CAMERA_WARMUP_LEAD_SEC before the photo, so the camera is only
+    on for that short window rather than for the whole session.
+    """
+
+    def __init__(self):
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0          # number of frames read so far
+        self._done = False     # reader thread has exited
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="camera-warmup", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        cap = None
+        failures = 0
+        try:
+            cap = _open_camera()
+            while cap is not None and not self._stop.is_set() and failures < 10:
+                ok, frame = cap.read()
+                if not ok or frame is None:
+                    failures += 1
+                    logger.warning("Camera read failed (%d)", failures)
+                    time.sleep(0.2)
+                    continue
+                failures = 0
+                with self._cond:
+                    self._frame = frame
+                    self._seq += 1
+                    self._cond.notify_all()
+        except Exception as e:
+            logger.warning("Camera capture error: %s", e)
+        finally:
+            if cap is not None:
+                cap.release()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def frame_after(self, seq: int, timeout: float):
+        """Wait for a frame newer than `seq`. Returns (seq, frame), frame None on timeout/failure."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > seq or self._done, timeout)
+            if self._seq > seq:
+                return self._seq, self._frame
+            return seq, None
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+def capture_camera(warmup: _CameraWarmup | None = None) -> memoryview | None:
+    """
+    Take a silent webcam photo. Returns the JPEG buffer or None.
+    Pass the _CameraWarmup started during the countdown to skip the open/settle wait.
+    """
+    own = warmup is None
+    if own:
+        warmup = _CameraWarmup()
+    warmup.start()
+    try:
+        # Returns immediately if the camera already warmed up during the countdown
+        seq, frame = warmup.frame_after(CAMERA_WARMUP_FRAMES - 1, timeout=5)
+
+        # Retry a couple of times if still blank
+        good = None
         for attempt in range(5):
-            ret, candidate = cap.read()
-            if not ret or candidate is None:
-                logger.warning("Camera read failed on attempt %d", attempt + 1)
-                time.sleep(0.2)
-                continue
-            if _is_blank_frame(candidate):
-                logger.info("Blank frame on attempt %d, retrying…", attempt + 1)
-                time.sleep(0.3)
-                continue
-            frame = candidate
-            break
-
-        if frame is None:
+            if frame is None:
+                break
+            if not _is_blank_frame(frame):
+                good = frame
+                break
+            logger.info("Blank frame on attempt %d, retrying…", attempt + 1)
+            time.sleep(0.3)
+            seq, frame = warmup.frame_after(seq, timeout=2)
+
+        if good is None:
             logger.warning("Camera produced only blank / unreadable frames after retries")
             return None
 
-        success, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        success, buf = cv2.imencode(".jpg", good, [cv2.IMWRITE_JPEG_QUALITY, 80])
         if not success:
             logger.warning("JPEG encode failed")
             return None
 
-        jpeg_bytes = buf.tobytes()
-        logger.info("Camera captured: %d bytes (%dx%d)", len(jpeg_bytes), frame.shape[1], frame.shape[0])
+        jpeg_bytes = _jpeg_view(buf)
+        logger.info("Camera captured: %d bytes (%dx%d)", len(jpeg_bytes), good.shape[1], good.shape[0])
         return jpeg_bytes
 
     except Exception as e:
         logger.warning("Camera capture error: %s", e)
         return None
     finally:
-        if cap is not None:
-            cap.release()
+        if own:
+            warmup.close()
 
 
 # ── Countdown + capture (screen + camera → upload → save log) ──
 
-def _run_countdown(capture_type: str):
+def _run_countdown(capture_type: str, on_lead=None):
     """
     Run a 60-second countdown with sound effects.
     - Plays a 'tung' sound at start
     - Notifies GUI every second with remaining time
+    - Calls on_lead() with CAMERA_WARMUP_LEAD_SEC left (camera warmup)
     - Plays 'tung' sound at 3, 2, 1 seconds
     Can be cancelled via _countdown_cancel event.
     """
-    _countdown_cancel.clear()
+    # Bind everything the loop touches once; callbacks are registered at startup
+    tick_cb = _on_countdown_tick
+    done_cb = _on_countdown_done
+    beep = _play_beep
+    cancel = _countdown_cancel
+    monotonic = time.monotonic
+    lead_at = CAMERA_WARMUP_LEAD_SEC if on_lead else None
+
+    cancel.clear()
 
     # Initial notification sound
-    _play_beep()
+    beep()
     logger.info("Countdown started: %s capture in %d seconds", capture_type, COUNTDOWN_SECONDS)
 
+    end = monotonic() + COUNTDOWN_SECONDS
     for remaining in range(COUNTDOWN_SECONDS, 0, -1):
-        if _countdown_cancel.is_set():
+        if cancel.is_set():
             logger.info("Countdown cancelled")
-            if _on_countdown_done:
-                try:
-                    _on_countdown_done()
-                except Exception:
-                    pass
+            _notify_done(done_cb)
             return False
 
         # Notify GUI
-        if _on_countdown_tick:
+        if tick_cb is not None:
             try:
-                _on_countdown_tick(remaining, capture_type)
+                tick_cb(remaining, capture_type)
             except Exception:
                 pass
 
+        if remaining == lead_at:
+            on_lead()
+
         # Play beep at 3, 2, 1 seconds
         if remaining <= 3:
-            _play_beep()
+            beep()
 
-        _countdown_cancel.wait(1.0)
+        # Sleep to the next whole second of the fixed deadline, so time spent
+        # in callbacks / beeps and wakeup jitter never accumulate into drift
+        cancel.wait(max(0.0, end - (remaining - 1) - monotonic()))
 
     # Countdown done — notify GUI
-    if _on_countdown_done:
+    _notify_done(done_cb)
+    return True
+
+
+def _notify_done(done_cb):
+    if done_cb is not None:
         try:
-            _on_countdown_done()
+            done_cb()
         except Exception:
             pass
 
-    return True
-
 
 def perform_capture(capture_type: str = "auto") -> dict:
     """
@@ -273,6 +467,7 @@ def perform_capture(capture_type: str = "auto") -> dict:
             return {"screenshot_url": None, "camera_url": None, "flagged": False, "skipped": True}
         _capture_in_progress = True
 
+    camera = _CameraWarmup()
     try:
         session = get_session()
         uid = session["uid"]
@@ -288,28 +483,32 @@ def perform_capture(capture_type: str = "auto") -> dict:
         screen_bytes_list = capture_screen()
 
         # Step 2: Countdown warning before camera capture
-        if not _run_countdown(capture_type):
+        if not _run_countdown(capture_type, on_lead=camera.start):
             return {"screenshot_url": None, "camera_url": None, "flagged": False, "skipped": True}
 
-        # Step 3: Take camera photo after countdown
-        camera_bytes = capture_camera()
+        # Step 3 + 4: Take camera photo after countdown. Screenshots go onto the
+        # shared upload pool right away (running while the camera is read) and the
+        # camera upload joins them as soon as the photo is taken.
+        screen_futures = [
+            upload_image_async(screen_bytes, f"screen{idx + 1}", uid)
+            for idx, screen_bytes in enumerate(screen_bytes_list)
+        ]
+        camera_bytes = capture_camera(camera)
+        camera_future = upload_image_async(camera_bytes, "camera", uid) if camera_bytes else None
 
-        # Step 4: Upload all screenshots
         screenshot_urls: list[str] = []
-        for idx, screen_bytes in enumerate(screen_bytes_list):
-            url = upload_image(screen_bytes, f"screen{idx + 1}", uid)
+        for idx, fut in enumerate(screen_futures):
+            url = fut.result()
             if url:
                 screenshot_urls.append(url)
             else:
                 logger.warning("Display %d upload failed", idx + 1)
 
+        camera_url = camera_future.result() if camera_future else None
+
         if not screenshot_urls:
             logger.warning("No screenshots were captured/uploaded")
-
-        camera_url = None
-        if camera_bytes:
-            camera_url = upload_image(camera_bytes, "camera", uid)
-        else:
+        if not camera_bytes:
             logger.warning("Camera capture returned None")
 
         flagged = not screenshot_urls and not camera_url
@@ -334,6 +533,7 @@ def perform_capture(capture_type: str = "auto") -> dict:
         return {"screenshot_url": screenshot_urls[0] if screenshot_urls else None, "screenshot_urls": screenshot_urls, "camera_url": camera_url, "flagged": flagged}
 
     finally:
+        camera.close()
         with _capture_lock:
             _capture_in_progress = False
             _last_capture_time = time.time()
@@ -341,34 +541,43 @@ def perform_capture(capture_type: str = "auto") -> dict:
 
 # ── Auto-capture scheduler (with cooldown + lock awareness) ────
 
-_auto_timer: threading.Timer | None = None
+# One long-lived thread sleeps until _next_fire_at; rescheduling just moves the
+# deadline and pokes _sched_event, instead of cancelling and spawning Timers.
+# Not on modules.scheduler: a capture blocks for the whole 60 s countdown.
+_auto_thread: threading.Thread | None = None
+_auto_stop: threading.Event | None = None   # one per scheduler thread, set to stop it
 _auto_callback = None
 _auto_running = False
+_next_fire_at: float = 0.0                  # time.monotonic() of the next auto-capture
+_sched_event = threading.Event()            # set whenever _next_fire_at changes
 
 
 def _schedule_next(delay: float | None = None):
-    global _auto_timer
+    global _next_fire_at
     if not _auto_running:
         return
     if delay is None:
         delay = _random_delay_sec()
     logger.info("Next auto-capture in ~%.0f min", delay / 60)
-    _auto_timer = threading.Timer(delay, _do_auto_capture)
-    _auto_timer.daemon = True
-    _auto_timer.start()
+    _next_fire_at = time.monotonic() + delay
+    _sched_event.set()
 
 
 def _reschedule_after_capture():
     """Push the next auto-capture out by cooldown + random delay."""
-    global _auto_timer
-    if _auto_timer:
-        _auto_timer.cancel()
-        _auto_timer = None
     if _auto_running:
         delay = POST_CAPTURE_COOLDOWN_SEC + _random_delay_sec()
         _schedule_next(delay)
 
 
+def _auto_loop(stop: threading.Event):
+    while not stop.is_set():
+        _sched_event.wait(max(0.0, _next_fire_at - time.monotonic()))
+        _sched_event.clear()
+        if not stop.is_set() and time.monotonic() >= _next_fire_at:
+            _do_auto_capture()
+
+
 def _do_auto_capture():
     if not _auto_running:
         return
@@ -391,7 +600,7 @@ def _do_auto_capture():
 
 
 def start_auto_capture(on_capture=None):
-    global _auto_timer, _auto_callback, _auto_running
+    global _auto_thread, _auto_stop, _auto_callback, _auto_running, _next_fire_at
     stop_auto_capture()
     _auto_running = True
     _auto_callback = on_capture
@@ -399,23 +608,26 @@ def start_auto_capture(on_capture=None):
     # First capture 3-5 min after check-in
     first_delay = (3 + random.random() * 2) * 60
     logger.info("First capture in ~%.0f min", first_delay / 60)
-    _auto_timer = threading.Timer(first_delay, _do_auto_capture)
-    _auto_timer.daemon = True
-    _auto_timer.start()
+    _next_fire_at = time.monotonic() + first_delay
+    _auto_stop = threading.Event()
+    _auto_thread = threading.Thread(target=_auto_loop, args=(_auto_stop,), name="auto-capture", daemon=True)
+    _auto_thread.start()
 
 
 def stop_auto_capture():
-    global _auto_timer, _auto_running
+    global _auto_thread, _auto_stop, _auto_running
     _auto_running = False
-    if _auto_timer:
-        _auto_timer.cancel()
-        _auto_timer = None
+    if _auto_stop:
+        _auto_stop.set()
+        _sched_event.set()   # wake the thread so it sees the stop
+    _auto_thread = None
+    _auto_stop = None
 
 
 # ── Remote capture command poller ──────────────────────────────
 
 _remote_thread: threading.Thread | None = None
-_remote_running = False
+_remote_stop: threading.Event | None = None   # one per poller thread, set to stop it
 _remote_callback = None
 
 
@@ -438,8 +650,10 @@ def _command_age_sec(cmd: dict) -> float:
 MAX_COMMAND_AGE_SEC = 300  # Ignore capture commands older than 5 minutes
 
 
-def _remote_poll_loop():
-    while _remote_running:
+def _remote_poll_loop(stop: threading.Event):
+    idle_rounds = 0
+    while not stop.is_set():
+        commands = []
         try:
             if has_session():
                 commands = check_capture_commands()
@@ -482,21 +696,27 @@ def _remote_poll_loop():
                     _reschedule_after_capture()
         except Exception as e:
             logger.warning("Remote poller error: %s", e)
-        time.sleep(REMOTE_POLL_SEC)
+
+        # Back off exponentially (with jitter) while nothing arrives; snap back on a hit
+        idle_rounds = 0 if commands else min(idle_rounds + 1, 4)
+        delay = min(REMOTE_POLL_MAX_SEC, REMOTE_POLL_SEC * 2 ** idle_rounds)
+        stop.wait(delay + random.uniform(0, 5) if idle_rounds else delay)
 
 
 def start_remote_poller(on_capture=None):
-    global _remote_thread, _remote_running, _remote_callback
+    global _remote_thread, _remote_stop, _remote_callback
     stop_remote_poller()
-    _remote_running = True
     _remote_callback = on_capture
-    _remote_thread = threading.Thread(target=_remote_poll_loop, daemon=True)
+    _remote_stop = threading.Event()
+    _remote_thread = threading.Thread(target=_remote_poll_loop, args=(_remote_stop,), daemon=True)
     _remote_thread.start()
 
 
 def stop_remote_poller():
-    global _remote_running, _remote_thread
-    _remote_running = False
+    global _remote_stop, _remote_thread
+    if _remote_stop:
+        _remote_stop.set()   # wakes the poller immediately instead of after its sleep
+        _remote_stop = None
     _remote_thread = None
 
 
@@ -514,3 +734,7 @@ def stop_all_tracking():
     stop_remote_poller()
     with _capture_lock:
         _capture_in_progress = False
+    try:
+        _GRAB_POOL.submit(_close_sct)
+    except RuntimeError:
+        pass
@@ -5,15 +5,54 @@ Uses Firestore REST API with Firebase ID token (Bearer auth).
 Mirrors the Electron desktop-app/modules/firebase.mjs functionality.
 """
 
+import copy
+import functools
 import time
 import logging
+import secrets
+import string
 import requests
 from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:   # stdlib fallback — same wire format, just slower
+    import json
+    _dumps = lambda obj: json.dumps(obj, separators=(",", ":")).encode()  # noqa: E731
+    _loads = json.loads
 
 logger = logging.getLogger("crazydesk.firebase")
 
 PROJECT_ID = "crazy-desk"
-BASE = f"https://firestore.googleapis.com/v1/projects/{PROJECT_ID}/databases/(default)/documents"
+HOST = "https://firestore.googleapis.com"
+DOC_ROOT = f"projects/{PROJECT_ID}/databases/(default)/documents"
+BASE = f"{HOST}/v1/{DOC_ROOT}"
+
+# One pooled keep-alive session for every Firestore call, so the periodic
+# heartbeat / activity / poller requests reuse a TLS connection instead of
+# handshaking each time. Every Firestore body is JSON, so Content-Type is a
+# session default; only the (refreshable) bearer token is set per request.
+_SESSION = requests.Session()
+_SESSION.headers.update({"Content-Type": "application/json"})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    # Retry transient gateway errors quickly. POST (create / :commit / :runQuery)
+    # is left out of the status retries — a 504 may still have applied a create —
+    # but like every method it is retried when the connection itself fails.
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=("HEAD", "GET", "PATCH"),
+        raise_on_status=False,
+    ),
+))
+TIMEOUT = (3.05, 8)   # (connect, read) — fail fast so the poller keeps its cadence
 
 # ── Session state ──────────────────────────────────────────────
 _token: str | None = None
@@ -43,12 +82,66 @@ def refresh_token(new_token: str):
     logger.info("Token refreshed")
 
 
+def warmup():
+    """Open the pooled connection up-front so the first real call skips the TLS handshake."""
+    try:
+        _SESSION.head(HOST, timeout=5)
+    except Exception as e:
+        logger.debug("Firestore warmup failed: %s", e)
+
+
 # ── Firestore value converters ─────────────────────────────────
 
+# Pre-typed value builders for fields whose type is fixed at the call site;
+# they skip _to_firestore's type dispatch entirely.
+def _sv(v: str) -> dict:
+    return {"stringValue": v}
+
+
+def _bv(v: bool) -> dict:
+    return {"booleanValue": v}
+
+
+def _iv(v: int) -> dict:
+    return {"integerValue": str(v)}
+
+
+def _tv(v: datetime) -> dict:
+    # Milliseconds are all a JS Date (the web app) can hold; keeps the payload short
+    return {"timestampValue": v.isoformat(timespec="milliseconds")}
+
+
 def _to_firestore(val):
     """Convert a Python value to Firestore REST value format."""
-    if val is None:
-        return {"nullValue": None}
+    fn = _FS_DISPATCH.get(type(val))
+    return fn(val) if fn else _to_firestore_slow(val)
+
+
+def _array_value(val) -> dict:
+    conv = _to_firestore
+    return {"arrayValue": {"values": [conv(v) for v in val]}}
+
+
+def _map_value(val) -> dict:
+    conv = _to_firestore
+    return {"mapValue": {"fields": {k: conv(v) for k, v in val.items() if v is not None}}}
+
+
+# Exact-type lookup for the common cases; subclasses (IntEnum, str enums,
+# datetime subclasses, …) miss the table and go through the isinstance chain.
+_FS_DISPATCH = {
+    type(None): lambda v: {"nullValue": None},
+    bool: _bv,
+    int: _iv,
+    float: lambda v: {"doubleValue": v},
+    str: _sv,
+    datetime: _tv,
+    list: _array_value,
+    dict: _map_value,
+}
+
+
+def _to_firestore_slow(val):
     if isinstance(val, bool):
         return {"booleanValue": val}
     if isinstance(val, int):
@@ -58,18 +151,27 @@ def _to_firestore(val):
     if isinstance(val, str):
         return {"stringValue": val}
     if isinstance(val, datetime):
-        return {"timestampValue": val.isoformat()}
+        return _tv(val)
     if isinstance(val, list):
-        return {"arrayValue": {"values": [_to_firestore(v) for v in val]}}
+        return _array_value(val)
     if isinstance(val, dict):
-        fields = {}
-        for k, v in val.items():
-            if v is not None:
-                fields[k] = _to_firestore(v)
-        return {"mapValue": {"fields": fields}}
+        return _map_value(val)
     return {"stringValue": str(val)}
 
 
+@functools.lru_cache(maxsize=256)
+def iso_to_ms(val: str) -> int:
+    """Parse an ISO-8601 timestamp string to epoch ms (cached — the same strings repeat)."""
+    return int(datetime.fromisoformat(val.replace("Z", "+00:00")).timestamp() * 1000)
+
+
+def _ts_to_ms(val) -> int:
+    """Epoch ms from a Firestore timestamp: a datetime, or the raw string if it didn't parse."""
+    if type(val) is str:
+        return iso_to_ms(val)
+    return int(val.timestamp() * 1000)
+
+
 def _from_firestore(val: dict):
     """Convert a Firestore REST value to Python."""
     if "stringValue" in val:
@@ -109,19 +211,25 @@ def _from_doc(doc: dict) -> dict:
 
 
 def _build_fields(data: dict) -> dict:
-    return {k: _to_firestore(v) for k, v in data.items() if v is not None}
+    conv = _to_firestore
+    return {k: conv(v) for k, v in data.items() if v is not None}
+
+
+_AUTO_ID_CHARS = string.ascii_letters + string.digits
+
+
+def _auto_id() -> str:
+    """20-char document ID, same alphabet as Firestore auto IDs (for :commit creates)."""
+    return "".join(secrets.choice(_AUTO_ID_CHARS) for _ in range(20))
 
 
 # ── HTTP helpers ───────────────────────────────────────────────
 
 def _firestore_req(method: str, path: str, body: dict | None = None) -> dict:
     url = f"{BASE}{path}"
-    headers = {
-        "Authorization": f"Bearer {_token}",
-        "Content-Type": "application/json",
-    }
     logger.debug("Firestore %s %s", method, path.split("?")[0])
-    resp = requests.request(method, url, headers=headers, json=body, timeout=15)
+    data = _dumps(body) if body is not None else None
+    resp = _SESSION.request(method, url, headers={"Authorization": f"Bearer {_token}"}, data=data, timeout=TIMEOUT)
     if not resp.ok:
         if resp.status_code == 401:
             logger.error(
@@ -132,7 +240,7 @@ def _firestore_req(method: str, path: str, body: dict | None = None) -> dict:
         else:
             logger.error("Firestore %s %s => %d: %s", method, path.split("?")[0], resp.status_code, resp.text[:300])
         resp.raise_for_status()
-    return resp.json()
+    return _loads(resp.content)
 
 
 # ── Work Logs ──────────────────────────────────────────────────
@@ -161,16 +269,16 @@ def get_active_session() -> dict | None:
             "limit": 1,
         },
     }
-    resp = requests.post(
+    resp = _SESSION.post(
         f"{BASE}:runQuery",
-        headers={"Authorization": f"Bearer {_token}", "Content-Type": "application/json"},
-        json=body,
-        timeout=15,
+        headers={"Authorization": f"Bearer {_token}"},
+        data=_dumps(body),
+        timeout=TIMEOUT,
     )
     if not resp.ok:
         logger.error("getActiveSession failed: %d %s", resp.status_code, resp.text[:200])
         return None
-    results = resp.json()
+    results = _loads(resp.content)
     if not results or not results[0].get("document"):
         return None
     return _from_doc(results[0]["document"])
@@ -196,8 +304,8 @@ def check_in() -> str:
             "PATCH",
             f"/member_profiles/{_uid}?updateMask.fieldPaths=isOnline&updateMask.fieldPaths=lastActive",
             {"fields": {
-                "isOnline": {"booleanValue": True},
-                "lastActive": {"timestampValue": now.isoformat()},
+                "isOnline": _bv(True),
+                "lastActive": _tv(now),
             }},
         )
     except Exception as e:
@@ -206,31 +314,75 @@ def check_in() -> str:
     return doc_id
 
 
-def _get_session_by_id(session_id: str) -> dict | None:
+# Short-lived copy of the current work_log, so break → resume don't each re-GET
+# the document. Writes below refresh it with what they wrote and drop it when they
+# fail (the write may still have landed, or the web app may have applied it).
+SESSION_CACHE_SEC = 120
+_session_cache: dict[str, tuple[float, dict]] = {}
+
+
+def _get_session_by_id(session_id: str, fresh: bool = False) -> dict | None:
+    hit = None if fresh else _session_cache.get(session_id)
+    if hit and time.monotonic() - hit[0] < SESSION_CACHE_SEC:
+        return copy.deepcopy(hit[1])
     try:
         doc = _firestore_req("GET", f"/work_logs/{session_id}")
-        return _from_doc(doc)
     except Exception:
         return None
+    session = _from_doc(doc)
+    _cache_session(session_id, session)
+    return copy.deepcopy(session)
+
+
+def _cache_session(session_id: str, session: dict):
+    _session_cache.clear()   # only one session is ever live
+    _session_cache[session_id] = (time.monotonic(), session)
+
+
+def _commit(writes: list[dict]) -> dict:
+    """Apply several document writes in one atomic :commit request."""
+    return _firestore_req("POST", ":commit", {"writes": writes})
+
+
+def _update_write(path: str, fields: dict) -> dict:
+    """A :commit write that updates exactly the given fields of `path`."""
+    return {
+        "update": {"name": f"{DOC_ROOT}/{path}", "fields": fields},
+        "updateMask": {"fieldPaths": list(fields)},
+    }
+
+
+def _presence_write(online: bool, stamp: dict) -> dict:
+    return _update_write(f"member_profiles/{_uid}", {
+        "isOnline": _bv(online),
+        "lastActive": stamp,
+    })
 
 
 def start_break(session_id: str, note: str = ""):
-    session = _get_session_by_id(session_id)
-    if not session:
-        return
-    breaks = session.get("breaks", []) or []
     entry: dict = {"startTime": datetime.now(timezone.utc)}
     if note:
         entry["note"] = note
-    breaks.append(entry)
-    _firestore_req(
-        "PATCH",
-        f"/work_logs/{session_id}?updateMask.fieldPaths=status&updateMask.fieldPaths=breaks",
-        {"fields": {
-            "status": {"stringValue": "break"},
-            "breaks": _to_firestore(breaks),
-        }},
-    )
+
+    # Append server-side with a field transform — no need to read the breaks array first
+    write = _update_write(f"work_logs/{session_id}", {"status": _sv("break")})
+    write["updateTransforms"] = [{
+        "fieldPath": "breaks",
+        "appendMissingElements": {"values": [_to_firestore(entry)]},
+    }]
+    write["currentDocument"] = {"exists": True}
+    try:
+        _commit([write])
+    except Exception:
+        _session_cache.pop(session_id, None)
+        raise
+
+    hit = _session_cache.get(session_id)
+    if hit:
+        session = copy.deepcopy(hit[1])
+        session["status"] = "break"
+        session["breaks"] = [*(session.get("breaks") or []), entry]
+        _cache_session(session_id, session)
 
 
 def resume_work(session_id: str):
@@ -243,27 +395,33 @@ def resume_work(session_id: str):
         if not last.get("endTime"):
             now = datetime.now(timezone.utc)
             last["endTime"] = now
-            start_str = last.get("startTime", "")
-            if isinstance(start_str, str):
-                start_ms = datetime.fromisoformat(start_str.replace("Z", "+00:00")).timestamp() * 1000
-            else:
-                start_ms = start_str.timestamp() * 1000
+            start_ms = _ts_to_ms(last.get("startTime", ""))
             last["durationMinutes"] = round((now.timestamp() * 1000 - start_ms) / 60000)
 
-    _firestore_req(
-        "PATCH",
-        f"/work_logs/{session_id}?updateMask.fieldPaths=status&updateMask.fieldPaths=breaks",
-        {"fields": {
-            "status": {"stringValue": "active"},
-            "breaks": _to_firestore(breaks),
-        }},
-    )
+    try:
+        _firestore_req(
+            "PATCH",
+            f"/work_logs/{session_id}?updateMask.fieldPaths=status&updateMask.fieldPaths=breaks",
+            {"fields": {
+                "status": _sv("active"),
+                "breaks": _to_firestore(breaks),
+            }},
+        )
+    except Exception:
+        _session_cache.pop(session_id, None)
+        raise
+    session["status"] = "active"
+    session["breaks"] = breaks
+    _cache_session(session_id, session)
 
 
 def check_out(session_id: str, check_in_time_ms: int, report: str, proof_link: str, total_break_sec: int):
     """Check out with report."""
-    session = _get_session_by_id(session_id)
+    # Always re-read: the whole breaks array is rewritten below, so a stale copy
+    # would wipe a break the cache never saw.
+    session = _get_session_by_id(session_id, fresh=True)
     now = datetime.now(timezone.utc)
+    now_ts = _tv(now)   # formatted once; both writes carry the identical stamp
     now_ms = int(now.timestamp() * 1000)
 
     breaks = (session or {}).get("breaks", []) or []
@@ -274,53 +432,29 @@ def check_out(session_id: str, check_in_time_ms: int, report: str, proof_link: s
         last = breaks[-1]
         if not last.get("endTime"):
             last["endTime"] = now
-            start_str = last.get("startTime", "")
-            if isinstance(start_str, str):
-                start_ms = datetime.fromisoformat(start_str.replace("Z", "+00:00")).timestamp() * 1000
-            else:
-                start_ms = start_str.timestamp() * 1000
+            start_ms = _ts_to_ms(last.get("startTime", ""))
             last["durationMinutes"] = round((now_ms - start_ms) / 60000)
             added_break_sec = int((now_ms - start_ms) / 1000)
 
     total_raw = round((now_ms - check_in_time_ms) / 60000) if check_in_time_ms else 0
     total_break_min = round((total_break_sec + added_break_sec) / 60)
 
-    mask = "&".join([
-        "updateMask.fieldPaths=checkOutTime",
-        "updateMask.fieldPaths=status",
-        "updateMask.fieldPaths=durationMinutes",
-        "updateMask.fieldPaths=breakDurationMinutes",
-        "updateMask.fieldPaths=report",
-        "updateMask.fieldPaths=attachments",
-        "updateMask.fieldPaths=breaks",
-    ])
-
-    _firestore_req(
-        "PATCH",
-        f"/work_logs/{session_id}?{mask}",
-        {"fields": {
-            "checkOutTime": {"timestampValue": now.isoformat()},
-            "status": {"stringValue": "completed"},
-            "durationMinutes": {"integerValue": str(max(0, total_raw - total_break_min))},
-            "breakDurationMinutes": {"integerValue": str(total_break_min)},
-            "report": {"stringValue": report or ""},
-            "attachments": _to_firestore([proof_link] if proof_link else []),
-            "breaks": _to_firestore(breaks),
-        }},
-    )
-
-    # Update member_profiles
+    # work_log + member_profiles presence in one round trip
     try:
-        _firestore_req(
-            "PATCH",
-            f"/member_profiles/{_uid}?updateMask.fieldPaths=isOnline&updateMask.fieldPaths=lastActive",
-            {"fields": {
-                "isOnline": {"booleanValue": False},
-                "lastActive": {"timestampValue": now.isoformat()},
-            }},
-        )
-    except Exception as e:
-        logger.warning("member_profiles update: %s", e)
+        _commit([
+            _update_write(f"work_logs/{session_id}", {
+                "checkOutTime": now_ts,
+                "status": _sv("completed"),
+                "durationMinutes": _iv(max(0, total_raw - total_break_min)),
+                "breakDurationMinutes": _iv(total_break_min),
+                "report": _sv(report or ""),
+                "attachments": _to_firestore([proof_link] if proof_link else []),
+                "breaks": _to_firestore(breaks),
+            }),
+            _presence_write(False, now_ts),
+        ])
+    finally:
+        _session_cache.pop(session_id, None)
 
 
 def emergency_check_out(session_id: str, check_in_time_ms: int, total_break_sec: int):
@@ -329,45 +463,25 @@ def emergency_check_out(session_id: str, check_in_time_ms: int, total_break_sec:
         return
     try:
         now = datetime.now(timezone.utc)
+        now_ts = _tv(now)   # formatted once; both writes carry the identical stamp
         now_ms = int(now.timestamp() * 1000)
         total_raw = round((now_ms - check_in_time_ms) / 60000) if check_in_time_ms else 0
         total_break_min = round((total_break_sec or 0) / 60)
 
-        mask = "&".join([
-            "updateMask.fieldPaths=checkOutTime",
-            "updateMask.fieldPaths=status",
-            "updateMask.fieldPaths=durationMinutes",
-            "updateMask.fieldPaths=breakDurationMinutes",
-            "updateMask.fieldPaths=report",
-            "updateMask.fieldPaths=attachments",
-            "updateMask.fieldPaths=flagged",
-            "updateMask.fieldPaths=flagReason",
-        ])
-
-        _firestore_req(
-            "PATCH",
-            f"/work_logs/{session_id}?{mask}",
-            {"fields": {
-                "checkOutTime": {"timestampValue": now.isoformat()},
-                "status": {"stringValue": "completed"},
-                "durationMinutes": {"integerValue": str(max(0, total_raw - total_break_min))},
-                "breakDurationMinutes": {"integerValue": str(total_break_min)},
-                "report": {"stringValue": "[Auto] App closed without manual checkout"},
+        _commit([
+            _update_write(f"work_logs/{session_id}", {
+                "checkOutTime": now_ts,
+                "status": _sv("completed"),
+                "durationMinutes": _iv(max(0, total_raw - total_break_min)),
+                "breakDurationMinutes": _iv(total_break_min),
+                "report": _sv("[Auto] App closed without manual checkout"),
                 "attachments": _to_firestore([]),
-                "flagged": {"booleanValue": True},
-                "flagReason": {"stringValue": "App quit or crashed without manual checkout"},
-            }},
-        )
-
-        # Update member_profiles
-        _firestore_req(
-            "PATCH",
-            f"/member_profiles/{_uid}?updateMask.fieldPaths=isOnline&updateMask.fieldPaths=lastActive",
-            {"fields": {
-                "isOnline": {"booleanValue": False},
-                "lastActive": {"timestampValue": now.isoformat()},
-            }},
-        )
+                "flagged": _bv(True),
+                "flagReason": _sv("App quit or crashed without manual checkout"),
+            }),
+            _presence_write(False, now_ts),
+        ])
+        _session_cache.pop(session_id, None)
         logger.info("Emergency checkout completed for session: %s", session_id)
     except Exception as e:
         logger.error("Emergency checkout failed: %s", e)
@@ -376,15 +490,22 @@ def emergency_check_out(session_id: str, check_in_time_ms: int, total_break_sec:
 # ── Tracker Logs ───────────────────────────────────────────────
 
 def save_tracker_log(data: dict):
-    payload = {**data, "timestamp": datetime.now(timezone.utc)}
-    return _firestore_req("POST", "/tracker_logs", {"fields": _build_fields(payload)})
+    fields = _build_fields(data)
+    fields["timestamp"] = _tv(datetime.now(timezone.utc))
+    return _firestore_req("POST", "/tracker_logs", {"fields": fields})
 
 
 # ── Activity Logs ──────────────────────────────────────────────
 
+def _activity_fields(data: dict) -> dict:
+    fields = _build_fields(data)
+    fields["timestamp"] = _tv(datetime.now(timezone.utc))
+    fields["period"] = _sv("5min")
+    return fields
+
+
 def save_activity_log(data: dict):
-    payload = {**data, "timestamp": datetime.now(timezone.utc), "period": "5min"}
-    return _firestore_req("POST", "/activity_logs", {"fields": _build_fields(payload)})
+    return _firestore_req("POST", "/activity_logs", {"fields": _activity_fields(data)})
 
 
 # ── Capture Commands ───────────────────────────────────────────
@@ -408,17 +529,17 @@ def check_capture_commands() -> list[dict]:
             "limit": 5,
         },
     }
-    resp = requests.post(
+    resp = _SESSION.post(
         f"{BASE}:runQuery",
-        headers={"Authorization": f"Bearer {_token}", "Content-Type": "application/json"},
-        json=body,
-        timeout=15,
+        headers={"Authorization": f"Bearer {_token}"},
+        data=_dumps(body),
+        timeout=TIMEOUT,
     )
     if not resp.ok:
         logger.error("checkCaptureCommands failed: %d %s", resp.status_code, resp.text[:200])
         return []
 
-    results = resp.json()
+    results = _loads(resp.content)
     commands = []
     for r in results:
         if r.get("document"):
@@ -431,24 +552,34 @@ def complete_capture_command(command_id: str):
         "PATCH",
         f"/capture_commands/{command_id}?updateMask.fieldPaths=status&updateMask.fieldPaths=completedAt",
         {"fields": {
-            "status": {"stringValue": "completed"},
-            "completedAt": {"timestampValue": datetime.now(timezone.utc).isoformat()},
+            "status": _sv("completed"),
+            "completedAt": _tv(datetime.now(timezone.utc)),
         }},
     )
 
 
 # ── Heartbeat ──────────────────────────────────────────────────
 
-def update_heartbeat(session_id: str):
+_HEARTBEAT_MASK = "?updateMask.fieldPaths=lastHeartbeat"
+
+
+def update_heartbeat(session_id: str, activity: dict | None = None):
+    """
+    Stamp lastHeartbeat on the work_log. If `activity` is given, the
+    activity_logs entry is created in the same :commit request.
+    Raises on failure so callers can track consecutive errors.
+    """
     if not session_id or not _token:
         return
-    try:
-        _firestore_req(
-            "PATCH",
-            f"/work_logs/{session_id}?updateMask.fieldPaths=lastHeartbeat",
-            {"fields": {
-                "lastHeartbeat": {"timestampValue": datetime.now(timezone.utc).isoformat()},
-            }},
-        )
-    except Exception as e:
-        logger.warning("Heartbeat failed: %s", e)
+    # Seconds are plenty for a liveness stamp and keep the payload short
+    heartbeat = {"lastHeartbeat": {"timestampValue": datetime.now(timezone.utc).isoformat(timespec="seconds")}}
+    if activity is None:
+        _firestore_req("PATCH", f"/work_logs/{session_id}{_HEARTBEAT_MASK}", {"fields": heartbeat})
+        return
+    _commit([
+        _update_write(f"work_logs/{session_id}", heartbeat),
+        {
+            "update": {"name": f"{DOC_ROOT}/activity_logs/{_auto_id()}", "fields": _activity_fields(activity)},
+            "currentDocument": {"exists": False},
+        },
+    ])
@@ -10,15 +10,27 @@ Provides:
 
 import logging
 import os
+import stat
 import sys
 import threading
 import time
+
+# Optional: routes Tk calls made from worker threads (HTTP server, tray,
+# scheduler) to the Tk thread. Must patch before tkinter is used.
+try:
+    import tkthread
+    tkthread.patch()
+except Exception:   # not installed / unsupported Tcl build — plain after_idle marshalling
+    tkthread = None
+
 import tkinter as tk
 from tkinter import font as tkfont
 
 import pystray
 from PIL import Image, ImageDraw
 
+from modules import tray
+
 logger = logging.getLogger("crazydesk.gui")
 
 # ── Colors (dark theme matching the web app) ───────────────────
@@ -35,17 +47,74 @@ ERROR    = "#ef4444"
 INFO     = "#3b82f6"
 
 
+# post_state() key → TrackerGUI attribute. Stats-only updates skip the full refresh.
+_STATE_ATTRS = {
+    "status": "_status",
+    "user_name": "_user_name",
+    "session_id": "_session_id",
+    "check_in_ms": "_check_in_ms",
+    "total_break_sec": "_total_break_sec",
+    "break_start_ms": "_break_start_ms",
+    "is_on_break": "_is_on_break",
+    "connected": "_connected",
+    "captures": "_capture_count",
+    "clicks": "_clicks",
+    "keys": "_keys",
+}
+_STATS_KEYS = frozenset({"captures", "clicks", "keys"})
+_HIDE_COUNTDOWN = object()
+STATS_CELL_CHARS = 8   # Consolas 16 ≈ 12 px/char → 8 chars ≈ one third of the stats row
+
+# Per-status lookups, shared by the window, the tray icon and its tooltip
+_STATUS_TEXT = {"active": "Checked In", "break": "On Break", "idle": "Waiting"}
+_DOT_COLORS = {"active": SUCCESS, "break": WARNING, "idle": TEXT2}
+_TRAY_COLORS = {"active": (34, 197, 94), "break": (234, 179, 8), "idle": (100, 109, 122)}
+
+
+def _resolve_icon_once() -> str | None:
+    """Find the window icon — checks the dev tree, next to the .exe, and the PyInstaller bundle."""
+    # Windows takes the .ico directly; other Tk builds only accept a PhotoImage
+    name = "icon.ico" if sys.platform == "win32" else "icon.png"
+    for base in (
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."),
+        os.path.dirname(os.path.abspath(sys.argv[0])),
+        getattr(sys, "_MEIPASS", ""),  # PyInstaller bundle
+    ):
+        path = os.path.join(base, "assets", name)
+        try:
+            if stat.S_ISREG(os.stat(path).st_mode):
+                return path
+        except OSError:
+            continue
+    return None
+
+
+_ICON_PATH = _resolve_icon_once()
+
+
+# Shared rounded-square background; each status icon is a copy plus one dot
+_BG = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
+ImageDraw.Draw(_BG).rounded_rectangle([2, 2, 62, 62], radius=12, fill=(30, 35, 42, 255))
+
+
+def _draw_tray_icon(status: str) -> Image.Image:
+    img = _BG.copy()
+    c = _TRAY_COLORS.get(status, _TRAY_COLORS["idle"])
+    r = 14
+    cx, cy = 32, 32
+    ImageDraw.Draw(img).ellipse([cx - r, cy - r, cx + r, cy + r], fill=c)
+    return img
+
+
+# Only three icons ever exist — draw them once at import
+_ICON_CACHE: dict[str, Image.Image] = {s: _draw_tray_icon(s) for s in _STATUS_TEXT}
+
+
 def _create_tray_icon(status: str) -> Image.Image:
     """64×64 tray icon with a status-coloured centre dot."""
-    size = 64
-    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
-    d = ImageDraw.Draw(img)
-    d.rounded_rectangle([2, 2, size - 2, size - 2], radius=12, fill=(30, 35, 42, 255))
-    colors = {"active": (34, 197, 94), "break": (234, 179, 8), "idle": (100, 109, 122)}
-    c = colors.get(status, colors["idle"])
-    r = 14
-    cx, cy = size // 2, size // 2
-    d.ellipse([cx - r, cy - r, cx + r, cy + r], fill=c)
+    img = _ICON_CACHE.get(status)
+    if img is None:
+        img = _ICON_CACHE[status] = _draw_tray_icon(status)
     return img
 
 
@@ -72,75 +141,113 @@ class TrackerGUI:
         self._check_in_ms = 0
         self._total_break_sec = 0
         self._break_start_ms = 0
+        # The same two instants as integer time.time_ns() values, for the timer tick
+        self._check_in_ns = 0
+        self._break_start_ns = 0
         self._is_on_break = False
         self._connected = False
 
+        # State posted from other threads, applied in one batch on the Tk thread
+        self._pending: dict = {}
+        self._pending_lock = threading.Lock()
+        self._apply_scheduled = False
+        # Latest requested countdown overlay state: (remaining, capture_type),
+        # _HIDE_COUNTDOWN, or None once applied. Only the newest one is drawn.
+        self._countdown_pending = None
+
         self._root: tk.Tk | None = None
+        self._window_icon: tk.PhotoImage | None = None
         self._tray: pystray.Icon | None = None
+        self._last_tray_status: str | None = None   # status / tooltip last pushed to the OS shell
+        self._last_tray_title: str | None = None
         self._timer_label: tk.Label | None = None
+        self._last_timer_str = "00:00:00"   # text currently shown on _timer_label
         self._status_label: tk.Label | None = None
         self._user_label: tk.Label | None = None
-        self._captures_label: tk.Label | None = None
-        self._activity_label_clicks: tk.Label | None = None
-        self._activity_label_keys: tk.Label | None = None
+        self._stats_label: tk.Label | None = None
         self._stats_frame: tk.Frame | None = None
         self._dot_canvas: tk.Canvas | None = None
+        self._dot_id: int | None = None   # the single oval on _dot_canvas, recoloured in place
         self._conn_label: tk.Label | None = None
         self._checkout_btn: tk.Button | None = None
         self._break_btn: tk.Button | None = None
         self._countdown_frame: tk.Frame | None = None
         self._countdown_label: tk.Label | None = None
         self._countdown_bar: tk.Canvas | None = None
+        self._checkout_visible = False     # checkout + break buttons currently packed
+        self._widget_cfg: dict = {}        # widget → options last applied by _configure
 
     # ── Public thread-safe setters ─────────────────────────────
 
+    def post_state(self, state: dict):
+        """
+        Merge state fields (keys of _STATE_ATTRS) from any thread. However many
+        posts arrive, they are applied together in a single idle callback.
+        """
+        with self._pending_lock:
+            self._pending.update(state)
+            if self._apply_scheduled or not self._root:
+                return
+            self._apply_scheduled = True
+        if not self._schedule_ui(self._apply_pending):
+            with self._pending_lock:   # let the next post try again
+                self._apply_scheduled = False
+
     def update_status(self, status: str):
-        self._status = status
-        self._schedule_ui(self._refresh_all)
+        self.post_state({"status": status})
 
     def update_session(self, *, user_name="", session_id="",
                        check_in_ms=0, total_break_sec=0,
                        break_start_ms=0, is_on_break=False):
-        self._user_name = user_name
-        self._session_id = session_id
-        self._check_in_ms = check_in_ms
-        self._total_break_sec = total_break_sec
-        self._break_start_ms = break_start_ms
-        self._is_on_break = is_on_break
-        self._connected = bool(session_id)
-        self._schedule_ui(self._refresh_all)
+        self.post_state({
+            "user_name": user_name,
+            "session_id": session_id,
+            "check_in_ms": check_in_ms,
+            "total_break_sec": total_break_sec,
+            "break_start_ms": break_start_ms,
+            "is_on_break": is_on_break,
+            "connected": bool(session_id),
+        })
 
     def update_stats(self, captures=0, clicks=0, keys=0):
-        self._capture_count = captures
-        self._clicks = clicks
-        self._keys = keys
-        self._schedule_ui(self._refresh_stats)
+        self.post_state({"captures": captures, "clicks": clicks, "keys": keys})
 
     def clear_session(self):
-        self._user_name = ""
-        self._session_id = ""
-        self._capture_count = 0
-        self._clicks = 0
-        self._keys = 0
-        self._check_in_ms = 0
-        self._total_break_sec = 0
-        self._break_start_ms = 0
-        self._is_on_break = False
-        self._connected = False
-        self._status = "idle"
-        self._schedule_ui(self._refresh_all)
+        self.post_state({
+            "user_name": "",
+            "session_id": "",
+            "captures": 0,
+            "clicks": 0,
+            "keys": 0,
+            "check_in_ms": 0,
+            "total_break_sec": 0,
+            "break_start_ms": 0,
+            "is_on_break": False,
+            "connected": False,
+            "status": "idle",
+        })
 
     def set_connected(self, connected: bool):
-        self._connected = connected
-        self._schedule_ui(self._refresh_all)
+        self.post_state({"connected": connected})
 
     def show_countdown(self, remaining: int, capture_type: str):
         """Update the countdown overlay (thread-safe). Called every second."""
-        self._schedule_ui(lambda: self._update_countdown(remaining, capture_type))
+        self._post_countdown((remaining, capture_type))
 
     def hide_countdown(self):
         """Hide the countdown overlay (thread-safe)."""
-        self._schedule_ui(self._hide_countdown_ui)
+        self._post_countdown(_HIDE_COUNTDOWN)
+
+    def _post_countdown(self, state):
+        # If the Tk thread falls behind, stale ticks are dropped rather than queued
+        if not self._root:
+            return
+        with self._pending_lock:
+            scheduled = self._countdown_pending is not None
+            self._countdown_pending = state
+        if not scheduled and not self._schedule_ui(self._apply_countdown):
+            with self._pending_lock:
+                self._countdown_pending = None
 
     # ── Lifecycle ──────────────────────────────────────────────
 
@@ -148,6 +255,7 @@ class TrackerGUI:
         """Enter the main GUI loop (call from main thread)."""
         self._build_window()
         self._start_tray()
+        self._apply_pending()       # anything posted before the window existed
         self._tick_timer()
         self._root.mainloop()
 
@@ -164,20 +272,17 @@ class TrackerGUI:
         self._root.geometry("340x480")
         self._root.resizable(False, False)
         self._root.protocol("WM_DELETE_WINDOW", self._on_close_button)
+        self._root.bind("<Map>", self._on_map)
 
-        # Try to set icon — check multiple locations for .exe and dev
-        for base in [
-            os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."),
-            os.path.dirname(os.path.abspath(sys.argv[0])),
-            getattr(sys, "_MEIPASS", ""),  # PyInstaller bundle
-        ]:
-            ico = os.path.join(base, "assets", "icon.ico")
-            if os.path.exists(ico):
-                try:
-                    self._root.iconbitmap(ico)
-                    break
-                except Exception:
-                    pass
+        if _ICON_PATH:
+            try:
+                if _ICON_PATH.endswith(".ico"):
+                    self._root.iconbitmap(_ICON_PATH)
+                else:
+                    self._window_icon = tk.PhotoImage(file=_ICON_PATH)   # keep a ref or Tk drops it
+                    self._root.iconphoto(True, self._window_icon)
+            except Exception:
+                pass
 
         # ── Title bar ──────────────────────────────────────────
         title_frame = tk.Frame(self._root, bg=BG2, padx=12, pady=8)
@@ -186,7 +291,7 @@ class TrackerGUI:
         self._dot_canvas = tk.Canvas(title_frame, width=12, height=12, bg=BG2,
                                      highlightthickness=0)
         self._dot_canvas.pack(side="left", padx=(0, 8))
-        self._draw_dot("idle")
+        self._dot_id = self._dot_canvas.create_oval(1, 1, 11, 11, fill=TEXT2, outline="")
 
         tk.Label(title_frame, text="CrazyDesk Tracker", font=("Segoe UI", 11, "bold"),
                  fg=TEXT2, bg=BG2).pack(side="left")
@@ -259,18 +364,18 @@ class TrackerGUI:
         self._stats_frame.pack(fill="x", padx=12, pady=(0, 8))
 
         for col in range(3):
-            self._stats_frame.columnconfigure(col, weight=1)
+            self._stats_frame.columnconfigure(col, weight=1, uniform="stats")
 
-        for i, (label_text, val) in enumerate([("Captures", "0"), ("Clicks", "0"), ("Keys", "0")]):
-            cell = tk.Frame(self._stats_frame, bg=BG2)
-            cell.grid(row=0, column=i, sticky="nsew", padx=4)
-            vl = tk.Label(cell, text=val, font=("Segoe UI", 16, "bold"), fg=WHITE, bg=BG2)
-            vl.pack()
-            tk.Label(cell, text=label_text, font=("Segoe UI", 7), fg=TEXT2, bg=BG2).pack()
-
-        self._captures_label = self._stats_frame.grid_slaves(row=0, column=0)[0].winfo_children()[0]
-        self._activity_label_clicks = self._stats_frame.grid_slaves(row=0, column=1)[0].winfo_children()[0]
-        self._activity_label_keys = self._stats_frame.grid_slaves(row=0, column=2)[0].winfo_children()[0]
+        # One monospace label carries all three values (one Tk write per update);
+        # each is centred in STATS_CELL_CHARS so it sits over its caption below.
+        self._stats_label = tk.Label(
+            self._stats_frame, text=self._stats_text(),
+            font=("Consolas", 16, "bold"), fg=WHITE, bg=BG2,
+        )
+        self._stats_label.grid(row=0, column=0, columnspan=3, sticky="ew")
+        for i, label_text in enumerate(("Captures", "Clicks", "Keys")):
+            tk.Label(self._stats_frame, text=label_text, font=("Segoe UI", 7),
+                     fg=TEXT2, bg=BG2).grid(row=1, column=i, padx=4)
 
         # ── Buttons ────────────────────────────────────────────
         btn_frame = tk.Frame(self._root, bg=BG, padx=12, pady=8)
@@ -341,91 +446,138 @@ class TrackerGUI:
                 pystray.MenuItem("Quit", lambda: self._on_quit() if self._on_quit else self._do_quit()),
             ),
         )
-        t = threading.Thread(target=self._tray.run, daemon=True)
+        t = threading.Thread(target=self._tray.run, name="tray", daemon=True)
         t.start()
+        tray.attach(self)   # legacy modules.tray API forwards to this icon
 
     def _update_tray_icon(self):
-        if self._tray:
-            try:
+        # Every icon/title assignment is a shell round trip — skip it when nothing changed
+        if not self._tray:
+            return
+        try:
+            if self._status != self._last_tray_status:
                 self._tray.icon = _create_tray_icon(self._status)
-                self._tray.title = f"CrazyDesk — {self._status_text()}"
-            except Exception:
-                pass
+                self._last_tray_status = self._status
+            title = f"CrazyDesk — {self._status_text()}"
+            if title != self._last_tray_title:
+                self._tray.title = title
+                self._last_tray_title = title
+        except Exception:
+            pass
 
     def _status_text(self) -> str:
-        return {"active": "Checked In", "break": "On Break", "idle": "Waiting"}.get(self._status, "Waiting")
+        return _STATUS_TEXT.get(self._status, "Waiting")
 
     # ── UI refresh helpers ─────────────────────────────────────
 
-    def _schedule_ui(self, fn):
-        """Schedule fn on the tkinter main thread."""
+    def _schedule_ui(self, fn) -> bool:
+        """
+        Schedule fn on the tkinter main thread. With tkthread patched in, the
+        after_idle call itself is dispatched straight to the Tk thread.
+        Returns False if fn could not be scheduled.
+        """
         if self._root:
             try:
                 self._root.after_idle(fn)
+                return True
             except Exception:
                 pass
+        return False
+
+    def _apply_pending(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._apply_scheduled = False
+        if not pending:
+            return
+        for key, value in pending.items():
+            setattr(self, _STATE_ATTRS[key], value)
+        if "check_in_ms" in pending or "break_start_ms" in pending:
+            self._rebase_clock()
+        if _STATS_KEYS.issuperset(pending):
+            self._refresh_stats()
+        else:
+            self._refresh_all()
+
+    def _apply_countdown(self):
+        with self._pending_lock:
+            state, self._countdown_pending = self._countdown_pending, None
+        if state is _HIDE_COUNTDOWN:
+            self._hide_countdown_ui()
+        elif state is not None:
+            self._update_countdown(*state)
 
     def _draw_dot(self, status):
-        c = self._dot_canvas
-        if not c:
+        if self._dot_canvas and self._dot_id is not None:
+            self._dot_canvas.itemconfigure(self._dot_id, fill=_DOT_COLORS.get(status, TEXT2))
+
+    def _configure(self, widget, **opts):
+        """widget.config(**opts), skipped when those options are already applied."""
+        if widget is None:
+            return
+        last = self._widget_cfg.get(widget)
+        if last == opts:
             return
-        c.delete("all")
-        colors = {"active": SUCCESS, "break": WARNING, "idle": TEXT2}
-        color = colors.get(status, TEXT2)
-        c.create_oval(1, 1, 11, 11, fill=color, outline="")
+        widget.config(**opts)
+        self._widget_cfg[widget] = opts
+
+    def _set_session_buttons(self, visible: bool):
+        # pack / pack_forget re-run geometry layout, so only touch them on a transition
+        if visible == self._checkout_visible:
+            return
+        self._checkout_visible = visible
+        for btn in (self._checkout_btn, self._break_btn):
+            if btn:
+                if visible:
+                    btn.pack(fill="x", pady=(0, 4))
+                else:
+                    btn.pack_forget()
 
     def _refresh_all(self):
         self._draw_dot(self._status)
         self._update_tray_icon()
 
         if self._connected and self._session_id:
-            self._conn_label.config(text="✅ Connected — Tracking active", fg=SUCCESS)
+            self._configure(self._conn_label, text="✅ Connected — Tracking active", fg=SUCCESS)
             name_display = self._user_name or "User"
-            self._user_label.config(text=name_display)
+            self._configure(self._user_label, text=name_display)
             if self._is_on_break:
-                self._status_label.config(text="☕ On Break", fg=WARNING)
+                self._configure(self._status_label, text="☕ On Break", fg=WARNING)
+                self._configure(
+                    self._break_btn,
+                    text="▶ Resume Work", bg=SUCCESS, fg=WHITE,
+                    activebackground="#16a34a", activeforeground=WHITE,
+                )
             else:
-                self._status_label.config(text="🟢 Working — Screen & camera capture active", fg=SUCCESS)
-            # Show checkout button
-            if self._checkout_btn:
-                self._checkout_btn.pack(fill="x", pady=(0, 4))
-            # Show break/resume button
-            if self._break_btn:
-                if self._is_on_break:
-                    self._break_btn.config(
-                        text="▶ Resume Work", bg=SUCCESS, fg=WHITE,
-                        activebackground="#16a34a", activeforeground=WHITE,
-                    )
-                else:
-                    self._break_btn.config(
-                        text="☕ Take a Break", bg=WARNING, fg=BG,
-                        activebackground="#ca8a04", activeforeground=BG,
-                    )
-                self._break_btn.pack(fill="x", pady=(0, 4))
+                self._configure(self._status_label, text="🟢 Working — Screen & camera capture active", fg=SUCCESS)
+                self._configure(
+                    self._break_btn,
+                    text="☕ Take a Break", bg=WARNING, fg=BG,
+                    activebackground="#ca8a04", activeforeground=BG,
+                )
+            # Show checkout and break/resume buttons
+            self._set_session_buttons(True)
         elif self._connected:
-            self._conn_label.config(text="✅ Connected", fg=SUCCESS)
+            self._configure(self._conn_label, text="✅ Connected", fg=SUCCESS)
         else:
-            self._conn_label.config(text="⏳ Waiting for web app connection...", fg=TEXT2)
-            self._user_label.config(text="Not connected")
-            self._status_label.config(
-                text="Open web dashboard → Check In → Desktop → Windows", fg=TEXT2
+            self._configure(self._conn_label, text="⏳ Waiting for web app connection...", fg=TEXT2)
+            self._configure(self._user_label, text="Not connected")
+            self._configure(
+                self._status_label,
+                text="Open web dashboard → Check In → Desktop → Windows", fg=TEXT2,
             )
-            self._timer_label.config(text="00:00:00")
+            self._set_timer_text("00:00:00")
             # Hide checkout and break buttons
-            if self._checkout_btn:
-                self._checkout_btn.pack_forget()
-            if self._break_btn:
-                self._break_btn.pack_forget()
+            self._set_session_buttons(False)
 
         self._refresh_stats()
 
     def _refresh_stats(self):
-        if self._captures_label:
-            self._captures_label.config(text=str(self._capture_count))
-        if self._activity_label_clicks:
-            self._activity_label_clicks.config(text=str(self._clicks))
-        if self._activity_label_keys:
-            self._activity_label_keys.config(text=str(self._keys))
+        self._configure(self._stats_label, text=self._stats_text())
+
+    def _stats_text(self) -> str:
+        w = STATS_CELL_CHARS
+        return f"{self._capture_count:^{w}}{self._clicks:^{w}}{self._keys:^{w}}"
 
     def _update_countdown(self, remaining: int, capture_type: str):
         """Show or update the countdown overlay."""
@@ -475,23 +627,44 @@ class TrackerGUI:
         if self._countdown_frame and self._countdown_frame.winfo_ismapped():
             self._countdown_frame.pack_forget()
 
-    def _tick_timer(self):
-        """Update the timer display every second."""
-        if self._check_in_ms and self._connected:
-            now_ms = int(time.time() * 1000)
-            cur_break = 0
-            if self._break_start_ms:
-                cur_break = int((now_ms - self._break_start_ms) / 1000)
-            total_sec = max(0, int((now_ms - self._check_in_ms) / 1000))
-            effective = max(0, total_sec - self._total_break_sec - cur_break)
-            h = effective // 3600
-            m = (effective % 3600) // 60
-            s = effective % 60
-            self._timer_label.config(text=f"{h:02d}:{m:02d}:{s:02d}")
+    def _rebase_clock(self):
+        """Convert the session instants to integer ns once, at update time."""
+        self._check_in_ns = self._check_in_ms * 1_000_000
+        self._break_start_ns = self._break_start_ms * 1_000_000
 
+    def _tick_timer(self):
+        """Update the timer display every second (skipped while the window is hidden)."""
         if self._root:
+            # withdrawn = minimised to tray, iconic = minimised to the taskbar
+            if self._root.state() not in ("withdrawn", "iconic"):
+                self._render_timer()
             self._root.after(1000, self._tick_timer)
 
+    def _render_timer(self):
+        if self._check_in_ns and self._connected:
+            # Integer-only. Wall-clock like the durations written to Firestore —
+            # monotonic_ns stops during suspend on Linux/macOS and would under-report.
+            now_ns = time.time_ns()
+            cur_break = 0
+            if self._break_start_ns:
+                cur_break = (now_ns - self._break_start_ns) // 1_000_000_000
+            total_sec = max(0, (now_ns - self._check_in_ns) // 1_000_000_000)
+            effective = max(0, total_sec - self._total_break_sec - cur_break)
+            h, rem = divmod(effective, 3600)
+            m, s = divmod(rem, 60)
+            self._set_timer_text(f"{h:02d}:{m:02d}:{s:02d}")
+
+    def _on_map(self, event):
+        # Window shown again (tray click, countdown pop-up, taskbar) — catch the timer up at once
+        if event.widget is self._root:
+            self._render_timer()
+
+    def _set_timer_text(self, text: str):
+        # The per-second tick only ever touches this one label, and only when the text changes
+        if text != self._last_timer_str:
+            self._timer_label.config(text=text)
+            self._last_timer_str = text
+
     # ── Actions ────────────────────────────────────────────────
 
     def _handle_break_toggle(self):
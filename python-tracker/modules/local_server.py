@@ -13,16 +13,29 @@ Endpoints:
   POST /api/checkout → Manual check-out with report
 
 CORS headers are added so the web app (any origin) can call these.
+Requests are served on their own threads over HTTP/1.1 keep-alive;
+the session-changing POSTs are still applied one at a time.
 """
 
-import json
+import hashlib
 import logging
 import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:   # stdlib fallback — same output, just slower
+    import json
+    _dumps = lambda obj: json.dumps(obj, separators=(",", ":")).encode()  # noqa: E731
+    _loads = json.loads
 
 logger = logging.getLogger("crazydesk.server")
 
 PORT = 59210
+MAX_BODY = 1 << 16   # 64 KiB — the web app only ever posts small JSON payloads
 
 # Callbacks set by main tracker
 _on_checkin = None
@@ -33,9 +46,21 @@ _on_break = None
 _on_resume = None
 _get_status = None
 
-_server: HTTPServer | None = None
+_server: ThreadingHTTPServer | None = None
 _thread: threading.Thread | None = None
 
+# checkin / refresh / checkout / break / resume mutate the tracker's session
+# globals, so they run one at a time. /api/capture has its own in-progress
+# guard and stays outside — otherwise a 60 s countdown would hold up checkout.
+_action_lock = threading.Lock()
+
+# Web app may poll /api/status several times a second — reuse the last
+# serialized body for a short window instead of rebuilding it each time.
+STATUS_CACHE_SEC = 0.05
+# Replaced as a whole tuple, so concurrent handlers never see a torn entry; at
+# worst two of them rebuild the body at the same moment.
+_status_cache: tuple[float, bytes, str] | None = None   # (monotonic ts, JSON body, ETag)
+
 
 def set_handlers(
     on_checkin=None,
@@ -56,90 +81,159 @@ def set_handlers(
     _get_status = get_status
 
 
+def _status_body() -> tuple[bytes, str]:
+    """Return the /api/status JSON body and its ETag, recomputed at most every STATUS_CACHE_SEC."""
+    global _status_cache
+    now = time.monotonic()
+    cached = _status_cache
+    if cached and now - cached[0] < STATUS_CACHE_SEC:
+        return cached[1], cached[2]
+    status = _get_status() if _get_status else {"running": True}
+    # get_status may hand back pre-encoded JSON bytes to skip serialization
+    body = status if isinstance(status, bytes) else _dumps(status)
+    if cached and body == cached[1]:
+        etag = cached[2]
+    else:
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    _status_cache = (now, body, etag)
+    return body, etag
+
+
 class _Handler(BaseHTTPRequestHandler):
     """HTTP request handler with CORS support."""
 
+    # Buffer headers + body so each response goes out in a single socket write
+    wbufsize = 8192
+    # Keep-alive: the web app reuses one connection for its status polls.
+    # Every response therefore carries Content-Length; idle connections close
+    # after `timeout` seconds so their threads don't linger.
+    protocol_version = "HTTP/1.1"
+    timeout = 30
+
     def log_message(self, format, *args):
         logger.debug("HTTP %s", format % args)
 
     def _cors_headers(self):
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Access-Control-Allow-Headers", "Content-Type, If-None-Match")
+        self.send_header("Access-Control-Expose-Headers", "ETag")
 
     def _json_response(self, status: int, data: dict):
-        body = json.dumps(data).encode()
+        self._send_body(status, _dumps(data))
+
+    def _send_body(self, status: int, body: bytes, etag: str | None = None):
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self._etag_headers(etag)
         self._cors_headers()
         self.end_headers()
         self.wfile.write(body)
+        self.wfile.flush()
+
+    def _etag_headers(self, etag: str):
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")   # always revalidate, never serve stale
 
-    def _read_json(self) -> dict:
-        length = int(self.headers.get("Content-Length", 0))
+    def _not_modified(self, etag: str):
+        self.send_response(304)
+        self._etag_headers(etag)
+        self._cors_headers()
+        self.end_headers()
+        self.wfile.flush()
+
+    def _read_json(self, length: int) -> dict:
         if length == 0:
             return {}
-        raw = self.rfile.read(length)
-        return json.loads(raw)
+        if length < 0:
+            raise ValueError("Negative Content-Length")
+        # Read straight into one preallocated buffer and parse it in place
+        buf = bytearray(length)
+        view = memoryview(buf)
+        got = 0
+        while got < length:
+            n = self.rfile.readinto(view[got:])
+            if not n:
+                raise ValueError("Truncated request body")
+            got += n
+        return _loads(buf)
 
     def do_OPTIONS(self):
         self.send_response(204)
         self._cors_headers()
         self.end_headers()
+        self.wfile.flush()
 
     def do_GET(self):
         if self.path == "/api/status":
-            status = _get_status() if _get_status else {"running": True}
-            self._json_response(200, status)
+            body, etag = _status_body()
+            # Conditional GET: an unchanged status costs one header line each way
+            inm = self.headers.get("If-None-Match")
+            if inm and etag in (t.strip() for t in inm.split(",")):
+                self._not_modified(etag)
+            else:
+                self._send_body(200, body, etag)
         else:
             self._json_response(404, {"error": "Not found"})
 
     def do_POST(self):
         try:
-            data = self._read_json()
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length > MAX_BODY:
+            # Refuse before allocating or reading anything; the unread body rules out keep-alive
+            self.close_connection = True
+            self._json_response(413, {"error": "Request body too large"})
+            return
+        try:
+            data = self._read_json(length)
         except Exception:
+            self.close_connection = True   # the body may not have been consumed
             self._json_response(400, {"error": "Invalid JSON"})
             return
 
+        if self.path == "/api/capture":
+            result = _on_capture(data) if _on_capture else {"ok": False}
+            self._json_response(200, result)
+            return
+
+        with _action_lock:
+            status, result = self._dispatch_action(data)
+        self._json_response(status, result)
+
+    def _dispatch_action(self, data: dict) -> tuple[int, dict]:
         if self.path == "/api/checkin":
             if not data.get("token") or not data.get("uid"):
-                self._json_response(400, {"error": "Missing token or uid"})
-                return
-            result = _on_checkin(data) if _on_checkin else {"ok": False}
-            self._json_response(200, result)
+                return 400, {"error": "Missing token or uid"}
+            return 200, _on_checkin(data) if _on_checkin else {"ok": False}
 
         elif self.path == "/api/refresh":
             if not data.get("token"):
-                self._json_response(400, {"error": "Missing token"})
-                return
-            result = _on_refresh(data) if _on_refresh else {"ok": False}
-            self._json_response(200, result)
-
-        elif self.path == "/api/capture":
-            result = _on_capture(data) if _on_capture else {"ok": False}
-            self._json_response(200, result)
+                return 400, {"error": "Missing token"}
+            return 200, _on_refresh(data) if _on_refresh else {"ok": False}
 
         elif self.path == "/api/checkout":
-            result = _on_checkout(data) if _on_checkout else {"ok": False}
-            self._json_response(200, result)
+            return 200, _on_checkout(data) if _on_checkout else {"ok": False}
 
         elif self.path == "/api/break":
-            result = _on_break(data) if _on_break else {"ok": False}
-            self._json_response(200, result)
+            return 200, _on_break(data) if _on_break else {"ok": False}
 
         elif self.path == "/api/resume":
-            result = _on_resume(data) if _on_resume else {"ok": False}
-            self._json_response(200, result)
+            return 200, _on_resume(data) if _on_resume else {"ok": False}
 
-        else:
-            self._json_response(404, {"error": "Not found"})
+        return 404, {"error": "Not found"}
 
 
 def start_server():
     global _server, _thread
     stop_server()
 
-    _server = HTTPServer(("127.0.0.1", PORT), _Handler)
+    # ThreadingHTTPServer uses daemon request threads, so open keep-alive
+    # connections never hold up process exit
+    _server = ThreadingHTTPServer(("127.0.0.1", PORT), _Handler)
     _thread = threading.Thread(target=_server.serve_forever, daemon=True)
     _thread.start()
     logger.info("Local API server started on http://127.0.0.1:%d", PORT)
@@ -149,5 +243,6 @@ def stop_server():
     global _server, _thread
     if _server:
         _server.shutdown()
+        _server.server_close()
         _server = None
     _thread = None
@@ -0,0 +1,87 @@
+"""
+CrazyDesk Tracker — Periodic task scheduler
+===========================================
+A single background thread runs all periodic jobs (heartbeat, GUI stats,
+activity flush) from a deadline heap guarded by one Condition, instead of
+each job owning a thread that sleeps on its own timer.
+
+    task = schedule(30, fn, interval=30)   # first run in 30s, then every 30s
+    task.cancel()
+    shutdown()                             # wakes the worker immediately
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger("crazydesk.scheduler")
+
+
+class Task:
+    """Handle returned by `schedule()` — call `cancel()` to drop it."""
+
+    __slots__ = ("fn", "interval", "cancelled")
+
+    def __init__(self, fn, interval: float | None):
+        self.fn = fn
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+_cv = threading.Condition()
+_heap: list[tuple[float, int, Task]] = []
+_seq = itertools.count()   # tie-breaker so equal deadlines never compare Tasks
+_thread: threading.Thread | None = None
+_running = False
+
+
+def _run():
+    while True:
+        with _cv:
+            while _running:
+                now = time.monotonic()
+                if _heap and _heap[0][0] <= now:
+                    break
+                _cv.wait(_heap[0][0] - now if _heap else None)
+            if not _running:
+                return
+            deadline, _, task = heapq.heappop(_heap)
+            if task.cancelled:
+                continue
+            if task.interval is not None:
+                next_at = max(deadline + task.interval, time.monotonic())
+                heapq.heappush(_heap, (next_at, next(_seq), task))
+
+        try:
+            task.fn()
+        except Exception as e:
+            logger.error("Scheduled task %s failed: %s", getattr(task.fn, "__name__", task.fn), e)
+
+
+def schedule(delay: float, fn, interval: float | None = None) -> Task:
+    """Run fn after `delay` seconds, then every `interval` seconds if given."""
+    global _thread, _running
+    task = Task(fn, interval)
+    with _cv:
+        heapq.heappush(_heap, (time.monotonic() + delay, next(_seq), task))
+        if not _running:
+            _running = True
+            _thread = threading.Thread(target=_run, name="scheduler", daemon=True)
+            _thread.start()
+        _cv.notify()
+    return task
+
+
+def shutdown():
+    """Stop the worker thread and drop every pending task."""
+    global _thread, _running
+    with _cv:
+        _running = False
+        _heap.clear()
+        _cv.notify()
+    _thread = None
@@ -4,9 +4,18 @@ CrazyDesk Tracker — Supabase Storage upload module
 Uploads screenshot / camera images to the tracker-evidence bucket.
 """
 
+import io
 import time
 import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 logger = logging.getLogger("crazydesk.supabase")
 
@@ -18,29 +27,59 @@ SUPABASE_ANON_KEY = (
     "Y6vp5QUYBPTEx-7q9HOFHeBmiruFIUs7acRS0qwXExk"
 )
 BUCKET = "tracker-evidence"
+JPEG_QUALITY = 75
+_JPEG_SOI = b"\xff\xd8"
+
+# One pooled session so back-to-back uploads (every display + camera) reuse
+# the TLS connection. Only failed connects are retried — a POST that reached
+# the bucket is never resent (it is INSERT-only, so a replay would be rejected).
+_session = requests.Session()
+_session.headers.update({
+    "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
+    "apikey": SUPABASE_ANON_KEY,
+})
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=2,
+        connect=2,
+        read=0,
+        status=0,
+        backoff_factor=0.3,
+        raise_on_status=False,
+    ),
+))
+_UPLOAD_HEADERS = {"Content-Type": "image/jpeg"}
+
+# Uploads are pure network wait; a few run side by side, the rest queue.
+_UPLOAD_POOL = ThreadPoolExecutor(max_workers=3, thread_name_prefix="supa-up")
 
 
-def upload_image(image_bytes: bytes, prefix: str, user_id: str) -> str | None:
+def upload_image(image_bytes: bytes | memoryview, prefix: str, user_id: str) -> str | None:
     """
     Upload a JPEG image to Supabase Storage.
-    Returns the public URL or None on failure.
+    Accepts bytes or any flat byte buffer (e.g. a memoryview over cv2.imencode output),
+    which is sent without copying. Returns the public URL or None on failure.
     """
     if len(image_bytes) < 100:
         logger.warning("Image buffer too small (%d bytes), skipping", len(image_bytes))
         return None
+    # Captures arrive as finished JPEGs and go out untouched; anything else
+    # (PNG, BMP, …) is converted exactly once
+    if image_bytes[:2] != _JPEG_SOI:
+        try:
+            image_bytes = _reencode_jpeg(image_bytes)
+        except Exception as e:
+            logger.error("Not a JPEG and could not be converted: %s", e)
+            return None
 
     filename = f"{prefix}_{user_id}_{int(time.time() * 1000)}.jpg"
     url = f"{SUPABASE_URL}/storage/v1/object/{BUCKET}/{filename}"
 
-    headers = {
-        "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
-        "apikey": SUPABASE_ANON_KEY,
-        "Content-Type": "image/jpeg",
-    }
-
     try:
         logger.info("Uploading %s image: %d bytes -> %s", prefix, len(image_bytes), filename)
-        resp = requests.post(url, headers=headers, data=image_bytes, timeout=30)
+        resp = _session.post(url, headers=_UPLOAD_HEADERS, data=image_bytes, timeout=30)
         if not resp.ok:
             logger.error("Supabase upload error %d: %s", resp.status_code, resp.text[:300])
             return None
@@ -52,3 +91,30 @@ def upload_image(image_bytes: bytes, prefix: str, user_id: str) -> str | None:
     except Exception as e:
         logger.error("Upload error: %s", e)
         return None
+
+
+def _jpeg_bytes(img: "Image.Image") -> bytes:
+    if img.mode != "RGB":
+        img = img.convert("RGB")   # JPEG has no alpha / palette
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=JPEG_QUALITY, optimize=False, subsampling=2)
+    return buf.getvalue()
+
+
+def _reencode_jpeg(data: bytes | memoryview) -> bytes:
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        return _jpeg_bytes(img)
+
+
+def upload_pil(img: "Image.Image", prefix: str, user_id: str) -> str | None:
+    """Encode a PIL image straight to JPEG (single pass) and upload it."""
+    return upload_image(_jpeg_bytes(img), prefix, user_id)
+
+
+def upload_image_async(image_bytes: bytes | memoryview, prefix: str, user_id: str) -> Future:
+    """
+    Queue upload_image on the shared upload pool without blocking.
+    The Future resolves to the public URL or None — it never raises.
+    """
+    return _UPLOAD_POOL.submit(upload_image, image_bytes, prefix, user_id)